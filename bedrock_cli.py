@@ -1,38 +1,67 @@
-import getpass
 import hashlib
 import subprocess
-import tempfile
 import time
-from pathlib import Path
-import pandas as pd
-from tabulate import tabulate
 import argparse
 import json
 import os
 import sys
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import chrome_install_mgr
+import cache_backends
+import catalog
 import config
-import logging
-from selenium.webdriver.remote.remote_connection import LOGGER
+import credentials
+import journal
+import metrics
+import mfa
 
-LOGGER.setLevel(logging.ERROR)
+# selenium, pandas and the modules that drive the browser (browser, chrome_install_mgr, page_helpers, preflight,
+# federation) are imported by the functions that use them.  Between them they take about a second to import, which a
+# command answered from the cache shouldn't have to pay.
 
 CHROMEDRIVER_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
-MODEL_LIST_URL = "https://us-east-1.console.aws.amazon.com/bedrock/home?region=us-east-1#/modelaccess"
+AWS_REGION = "us-east-1"
+MODEL_LIST_URL = f"https://{AWS_REGION}.console.aws.amazon.com/bedrock/home?region={AWS_REGION}#/modelaccess"
 MAIN_AWS_SCREEN_URL = "https://aws.amazon.com/"
 HEADLESS = True
 
-AWS_ACCOUNT_ID = ""
-IAM_ADMIN_USER = ""
-IAM_ADMIN_PWD = ""
-
-CACHE_DIR = Path("./cache")
 CACHE_TTL = 300  # 5 minutes in seconds
+SCRAPE_LEASE_TTL = 600  # how long one runner may hold the "I'm scraping" lease before others give up waiting on it
+SCRAPE_LEASE_POLL = 2  # seconds between checks while waiting on another runner's scrape
+MFA_ATTEMPTS = 3  # codes to try before giving up on the MFA page
+
+# the search box above the model access table, used to narrow the table down to specific models
+MODEL_FILTER_SELECTOR = "input[type='search']"
+
+# the messages the MFA page shows when it turns a code down
+MFA_ERROR_SELECTOR = "[role='alert'], [data-testid*='error']"
+# marks the error messages already on the MFA page, so only one that appears after a submit counts as a rejection
+MFA_MARK_ERRORS_JS = """
+document.querySelectorAll(arguments[0]).forEach(e => e.setAttribute("data-bedrock-cli-seen", ""));
+"""
+# "accepted" once the MFA field is gone, "rejected" if a new error message is showing, otherwise null (keep waiting)
+MFA_OUTCOME_JS = """
+if (!document.getElementById("mfaCode")) return "accepted";
+const rejected = Array.from(document.querySelectorAll(arguments[0]))
+    .some(e => !e.hasAttribute("data-bedrock-cli-seen") && e.offsetParent !== null && e.innerText.trim());
+return rejected ? "rejected" : null;
+"""
+
+# get-model-status exit codes, so CI jobs can branch on the status without parsing the output.  When more than one
+# model is requested the highest code wins.
+EXIT_ACCESS_GRANTED = 0
+EXIT_IN_PROGRESS = 10
+EXIT_AVAILABLE_TO_REQUEST = 11
+EXIT_ACCESS_DENIED = 12
+EXIT_UNKNOWN = 13
+
+STATUS_EXIT_CODES = {
+    "access granted": EXIT_ACCESS_GRANTED,
+    "in progress": EXIT_IN_PROGRESS,
+    "access requested": EXIT_IN_PROGRESS,
+    "available to request": EXIT_AVAILABLE_TO_REQUEST,
+    "access denied": EXIT_ACCESS_DENIED,
+    "unavailable": EXIT_ACCESS_DENIED,
+    "not available": EXIT_ACCESS_DENIED,
+}
 
 
 # This function invokes:  aws bedrock list-foundation-models --output json
@@ -52,39 +81,130 @@ def load_model_data():
         exit(1)
 
 
+# Signs in by opening a console federation URL built from temporary AWS credentials (see federation.py).  The browser
+# lands directly on MODEL_LIST_URL in one navigation, so there's no sign-in form to fill in.  Returns the driver, or
+# raises if we didn't end up on the console.
+def federated_login_to_console():
+    import browser
+    import chrome_install_mgr
+    import federation
+
+    # the cache and the journal are namespaced by the account we were told about; landing in a different one would
+    # mix accounts up, so in that case the form login (which signs in to the account we were told about) is used
+    expected_account_id = credentials.known_account_id()
+    federated_account_id = federation.get_caller_account_id()
+    if expected_account_id and federated_account_id and federated_account_id != str(expected_account_id):
+        raise ValueError(f"The AWS credentials are for account {federated_account_id}, not {expected_account_id}")
+
+    metrics.inc("bedrock_cli_login_attempts_total")
+    login_start = time.monotonic()
+    login_url = federation.get_federated_login_url(MODEL_LIST_URL)
+    driver = browser.launch_browser(HEADLESS)
+    try:
+        if config.is_verbose_mode():
+            print("Navigating to federated sign-in URL")
+        driver.get(login_url)
+        chrome_install_mgr.wait_for_browser_settle(driver)
+        if "console" not in driver.current_url or "redirect" in driver.current_url:
+            raise ValueError("Federated sign-in did not land on console URL.  Current url=" + driver.current_url)
+    except Exception:
+        metrics.inc("bedrock_cli_login_failures_total")
+        driver.quit()
+        raise
+    finally:
+        metrics.observe("bedrock_cli_login_duration_seconds", time.monotonic() - login_start)
+
+    if config.is_verbose_mode():
+        print(">>>Successfully landed on console URL.<<<")
+    return driver
+
+
+# Fills in the MFA page with a code from mfa_provider and submits it.  If the page shows a new error message, or is
+# still asking for a code once the mfa_verify budget is up, the code was rejected (typically a clock-step boundary, or
+# a code already used), and it's retried with the provider's next code, up to MFA_ATTEMPTS times.
+def submit_mfa_code(driver, mfa_provider):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    import chrome_install_mgr
+
+    for attempt in range(1, MFA_ATTEMPTS + 1):
+        mfa_field = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.ID, "mfaCode"))
+        )
+        code = mfa_provider.next_code()
+        mfa_field.clear()
+        mfa_field.send_keys(code)
+        if config.is_verbose_mode():
+            print(f"Submitting MFA code from {mfa_provider.name} (attempt {attempt})...")
+        mfa_submit = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='mfa-submit-button']"))
+        )
+        driver.execute_script(MFA_MARK_ERRORS_JS, MFA_ERROR_SELECTOR)
+        mfa_submit.click()
+        try:
+            outcome = chrome_install_mgr.wait_until(
+                driver, "mfa_verify", lambda d: d.execute_script(MFA_OUTCOME_JS, MFA_ERROR_SELECTOR),
+                record_timeout=False
+            )
+        except TimeoutException:
+            outcome = "rejected"
+        if outcome == "rejected":
+            metrics.inc("bedrock_cli_mfa_rejections_total", {"method": mfa_provider.name})
+            if config.is_verbose_mode():
+                print("MFA code wasn't accepted")
+            continue
+        chrome_install_mgr.wait_for_browser_settle(driver)
+        if config.is_verbose_mode():
+            print("Current URL: " + driver.current_url)
+        return
+    raise ValueError(f"MFA code from {mfa_provider.name} rejected {MFA_ATTEMPTS} times")
+
+
 # This is the code that navigates us to the AWS console.  It would have to be changed to accommodate whatever
-# environment you're running in.  This uses a basic login to an admin user.  It SHOULD support MFA by asking the
-# user to provide their MFA number from their authenticator, though that obviously prevents automation, so I turned off
-# my MFA on my user while working on this
+# environment you're running in.  This uses a basic login to an admin user.  If the user has MFA, the code comes from
+# the MFA provider picked by --mfa-method (see mfa.py), so with a stored TOTP seed or an MFA command the login doesn't
+# need anyone at the keyboard.
+#
+# With --login-method federation the sign-in form is skipped entirely (see federated_login_to_console()), and this
+# form login is only used as a fallback if the federated sign-in fails.
 def login_to_console(destination_url):
-    chrome_driver_path = chrome_install_mgr.ensure_chromedriver_installed()
-    options = webdriver.ChromeOptions()
-    options.add_argument(f"--user-data-dir={tempfile.mkdtemp()}")
-    options.add_argument("--incognito")
-    if HEADLESS:
-        options.add_argument("--headless")
-        options.add_argument("--log-level=1")
-        options.add_argument("--remote-debugging-port=0")
-        options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        options.add_argument("--no-sandbox")
-        options.add_argument("--silent")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--window-size=1920,1080")
-        options.headless = True
-
-    service_args_l = ["--silent"]
-    service = Service(chrome_driver_path, service_args=service_args_l, log_output="me.log")
-
-    driver = webdriver.Chrome(service=service, options=options)
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    import browser
+    import chrome_install_mgr
+
+    if config.get_login_method() == "federation":
+        try:
+            return federated_login_to_console()
+        except Exception as e:
+            print(f"Federated sign-in failed, falling back to the sign-in form: {e}")
+
+    # resolved here rather than up front, so runs that never need to log in never ask for credentials
+    try:
+        console_credentials = credentials.get_credentials()
+    except credentials.CredentialsUnavailableError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    try:
+        mfa_provider = mfa.get_mfa_provider()
+    except mfa.MfaUnavailableError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    metrics.inc("bedrock_cli_login_attempts_total")
+    login_start = time.monotonic()
+    driver = browser.launch_browser(HEADLESS)
     if config.is_verbose_mode():
         print("Navigating to " + destination_url)
     driver.get(destination_url)
     if config.is_verbose_mode():
         print("Waiting to see sign in button...")
     try:
-        # Wait up to 30 seconds for the "Sign In" link to appear
-        sign_in_link = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.LINK_TEXT, "Sign In"))
+        # Wait for the "Sign In" link to appear (the timeout comes from the config timing profile)
+        sign_in_link = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.LINK_TEXT, "Sign In"))
         )
         if config.is_verbose_mode():
             print("Found the Sign In link, clicking...")
@@ -95,65 +215,52 @@ def login_to_console(destination_url):
             print("Current URL: " + driver.current_url)
             print("Waiting for account field to appear...")
 
-        account_field = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "account"))  # Adjust this as needed
+        account_field = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.ID, "account"))  # Adjust this as needed
         )
 
         account_field.clear()
-        account_field.send_keys(str(AWS_ACCOUNT_ID))
+        account_field.send_keys(str(console_credentials["account_id"]))
 
         if config.is_verbose_mode():
             print("Waiting for IAM user field to appear...")
 
-        user_field = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "username"))
+        user_field = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.ID, "username"))
         )
         user_field.clear()
-        user_field.send_keys(str(IAM_ADMIN_USER))
+        user_field.send_keys(str(console_credentials["user"]))
 
         if config.is_verbose_mode():
             print("Waiting for IAM pwd field to appear...")
 
-        pwd_field = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "password"))
+        pwd_field = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.ID, "password"))
         )
         pwd_field.clear()
-        pwd_field.send_keys(str(IAM_ADMIN_PWD))
-        time.sleep(3)
+        pwd_field.send_keys(str(console_credentials["password"]))
 
         if config.is_verbose_mode():
             print("Waiting for sign in to appear...")
 
-        sign_in_link2 = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "signin_button"))
+        sign_in_link2 = chrome_install_mgr.wait_until(
+            driver, "login_element", EC.presence_of_element_located((By.ID, "signin_button"))
         )
 
         sign_in_link2.click()
-        chrome_install_mgr.wait_for_browser_settle(driver)
-        ctr = 0
-        while ctr < 5 and "signin" in driver.current_url:
-            time.sleep(1)
-            ctr = ctr + 1
-
-        if "oauth" in driver.current_url:
-            mfa_field = WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.ID, "mfaCode"))
-            )
-
-            mfa = input("Type your MFA code: ")
-            mfa_field.clear()
-            mfa_field.send_keys(mfa)
-            if config.is_verbose_mode():
-                print("Waiting for sign in to appear...")
-            sign_in_link_x = WebDriverWait(driver, 30).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='mfa-submit-button']"))
+        # the MFA field showing up counts as having left the sign in form, so the code goes in as soon as it appears
+        try:
+            chrome_install_mgr.wait_until(
+                driver, "login_redirect",
+                lambda d: "signin" not in d.current_url or d.find_elements(By.ID, "mfaCode")
             )
+        except TimeoutException:
+            pass
 
-            sign_in_link_x.click()
-            time.sleep(3)
+        if "oauth" in driver.current_url or driver.find_elements(By.ID, "mfaCode"):
+            submit_mfa_code(driver, mfa_provider)
+        else:
             chrome_install_mgr.wait_for_browser_settle(driver)
-            if config.is_verbose_mode():
-                print("Current URL: " + driver.current_url)
 
     except Exception as e:
         timestamp = time.strftime("%Y%m%d-%H%M%S")
@@ -163,40 +270,51 @@ def login_to_console(destination_url):
         print(e)
 
     finally:
+        metrics.observe("bedrock_cli_login_duration_seconds", time.monotonic() - login_start)
         if "console" in driver.current_url and "redirect" not in driver.current_url:
             if config.is_verbose_mode():
                 print(">>>Successfully landed on console URL.<<<")
             return driver
         else:
+            metrics.inc("bedrock_cli_login_failures_total")
             timestamp = time.strftime("%Y%m%d-%H%M%S")
             screenshot_path = f"error_screenshot_{timestamp}.png"
             driver.save_screenshot(screenshot_path)
             raise ValueError("Did not land on console URL.  Current url=" + driver.current_url)
 
 
+# opens the bedrock model list, unless the browser is already sitting on it (which is where a federated sign-in lands)
+def navigate_to_model_list(driver):
+    import chrome_install_mgr
+
+    if driver.current_url == MODEL_LIST_URL:
+        return
+    if config.is_verbose_mode():
+        print("Navigating to bedrock model list")
+    driver.get(MODEL_LIST_URL)
+    chrome_install_mgr.wait_for_browser_settle(driver)
+
+
 # this code navigates to the bedrock model list and gathers up all the installed statuses from the catalog table
 def scrape_access_status(driver):
-    access_status = {}
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    import chrome_install_mgr
+
+    access_status = []
     try:
-        if config.is_verbose_mode():
-            print("Navigating to bedrock model list")
-        driver.get(MODEL_LIST_URL)
-        chrome_install_mgr.wait_for_browser_settle(driver)
+        with metrics.timed("bedrock_cli_scrape_duration_seconds", {"kind": "full"}):
+            navigate_to_model_list(driver)
 
-        if config.is_verbose_mode():
-            print("Waiting for table to appear...")
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table")))
+            if config.is_verbose_mode():
+                print("Waiting for table to appear...")
+            chrome_install_mgr.wait_until(
+                driver, "model_table", EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
+            )
 
-        if config.is_verbose_mode():
-            print("Searching table...")
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-        for row in rows:
-            cells_for_this_row = row.find_elements(By.TAG_NAME, "td")
-            if len(cells_for_this_row) > 1 and "/" not in cells_for_this_row[1].text:
-                model_id = cells_for_this_row[0].text.split("\n")[0].strip()
-                status = cells_for_this_row[1].text.split("\n")[0].strip()
-                access_status[model_id] = status
+            access_status = read_access_status_rows(driver)
     except Exception as e:
+        metrics.inc("bedrock_cli_scrape_failures_total")
         timestamp = time.strftime("%Y%m%d-%H%M%S")
         screenshot_path = f"error_screenshot_{timestamp}.png"
         driver.save_screenshot(screenshot_path)
@@ -204,12 +322,68 @@ def scrape_access_status(driver):
 
     return access_status
 
-# this is the code that sets the access status node in the JSON object for a specific model
+
+# same as scrape_access_status(), but instead of reading the whole catalog it types each requested model name into the
+# console's table filter and only reads back the rows that survive the filter.  Used by get-model-status on a cache miss.
+# A failed scrape is raised rather than returning no rows, so it isn't mistaken for models with an unknown status.
+def scrape_access_status_for_models(driver, model_names):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    import chrome_install_mgr
+
+    access_status = []
+    try:
+        with metrics.timed("bedrock_cli_scrape_duration_seconds", {"kind": "filtered"}):
+            navigate_to_model_list(driver)
+
+            if config.is_verbose_mode():
+                print("Waiting for table filter to appear...")
+            filter_field = chrome_install_mgr.wait_until(
+                driver, "model_table", EC.presence_of_element_located((By.CSS_SELECTOR, MODEL_FILTER_SELECTOR))
+            )
+
+            for model_name in model_names:
+                if config.is_verbose_mode():
+                    print(f"Filtering table for '{model_name}'...")
+                filter_field.clear()
+                filter_field.send_keys(model_name)
+                chrome_install_mgr.wait_for_browser_settle(driver)
+                # a row can survive more than one filter, so only keep the first copy
+                access_status.extend(row for row in read_access_status_rows(driver) if row not in access_status)
+    except Exception:
+        metrics.inc("bedrock_cli_scrape_failures_total")
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        screenshot_path = f"error_screenshot_{timestamp}.png"
+        driver.save_screenshot(screenshot_path)
+        print(f"Error while scraping, screen at: {screenshot_path}", file=sys.stderr)
+        raise
+
+    return access_status
+
+
+# reads every row currently shown in the catalog table, in table order, as {"name", "status", "text"}.  The display
+# name alone isn't unique, so the full row text is kept too, for catalog.CatalogIndex to resolve the row to a model ID.
+def read_access_status_rows(driver):
+    import page_helpers
+
+    access_status = []
+    if config.is_verbose_mode():
+        print("Searching table...")
+    rows = page_helpers.call(driver, "extractTable", "table tbody tr")["rows"]
+    for cell_texts in rows:
+        if len(cell_texts) > 1 and "/" not in cell_texts[1]:
+            access_status.append({
+                "name": cell_texts[0].split("\n")[0].strip(),
+                "status": cell_texts[1].split("\n")[0].strip(),
+                "text": "\n".join(cell_texts),
+            })
+    return access_status
+
+
+# this is the code that sets the access status node in the JSON object for every model, joining the scraped rows to
+# the catalog by model ID (see catalog.CatalogIndex.resolve_rows())
 def update_access_status(models, access_status):
-    for model in models['modelSummaries']:
-        model_name = model['modelName']
-        model['accessStatus'] = access_status.get(model_name, 'Unknown')
-    return models
+    return catalog.CatalogIndex(models).apply_access_status(access_status)
 
 
 # this code logs in, scrapes all the enablement statuses from the bedrock catalog table, and then updates the
@@ -220,9 +394,11 @@ def enhance_foundation_model_data(input_json):
     if config.is_verbose_mode():
         print("Scraping Access Status from AWS Console...")
 
-    access_list = {}
+    access_list = []
     retry_ctr = 0
     while not access_list:
+        if retry_ctr > 0:
+            metrics.inc("bedrock_cli_scrape_retries_total")
         access_list = scrape_access_status(driver)
         retry_ctr = retry_ctr + 1
         if retry_ctr >= 10:
@@ -238,45 +414,123 @@ def enhance_foundation_model_data(input_json):
 
 
 # this code invokes enhance_foundation_model_data if there are no current cached copies of its output, otherwise it
-# just returns a cached copy
+# just returns a cached copy.  When the cache is shared (see cache_backends.py) only one runner at a time scrapes the
+# console for a given account and region; the others wait for its result instead of scraping too.
 def get_foundation_model_enablement_status(args):
-    CACHE_DIR.mkdir(exist_ok=True)
-
     # Check for --no-cache flag
     try:
         use_cache = args.no_cache is False
     except:
         use_cache = True
 
-    # Generate a stable cache key that ignores function pointers
-    cache_key = generate_cache_key(args)
+    # Generate a stable cache key that ignores function pointers, namespaced by account and region
+    cache_key = namespaced_cache_key(args)
+    if cache_key is None and use_cache:
+        print("Warning: not using the cache, since the account ID isn't known up front.  Pass --account or set "
+              "AWS_ACCOUNT_ID (or account_id in the credentials file) to use it.", file=sys.stderr)
+        use_cache = False
 
-    # Cache file path
-    cache_file = CACHE_DIR / f"{cache_key}.json"
-
-    # Remove stale cache files
-    clean_old_cache_files()
+    # Remove stale cache entries.  A cache we can't open or purge is skipped, the same as --no-cache.
+    try:
+        cache = cache_backends.get_cache_backend(config.get_cache_spec())
+        cache.purge(CACHE_TTL)
+    except cache_backends.CacheUnavailableError as e:
+        if use_cache:
+            print(f"Warning: not using the cache: {e}", file=sys.stderr)
+        use_cache = False
 
     # Use cache if available and allowed
-    if use_cache and cache_file.exists() and (time.time() - cache_file.stat().st_mtime) < CACHE_TTL:
-        with open(cache_file, "r") as f:
-            data = json.load(f)
+    data = cache.get(cache_key, CACHE_TTL) if use_cache else None
+    if not use_cache:
+        metrics.inc("bedrock_cli_cache_requests_total", {"result": "bypass"})
+    elif data is not None:
+        metrics.inc("bedrock_cli_cache_requests_total", {"result": "hit"})
     else:
-        # Perform the expensive operations
-        data = load_model_data()
-        enhance_foundation_model_data(data)
-
-        # Cache the results if caching is enabled
-        if use_cache:
-            with open(cache_file, "w") as f:
-                json.dump(data, f)
+        metrics.inc("bedrock_cli_cache_requests_total", {"result": "miss"})
+
+    leased = False
+    if data is None and use_cache:
+        data, leased = claim_or_wait_for_scrape(cache, cache_key)
+
+    if data is None:
+        try:
+            # Perform the expensive operations
+            data = load_model_data()
+            enhance_foundation_model_data(data)
+
+            # Cache the results if caching is enabled
+            if use_cache:
+                try:
+                    cache.put(cache_key, data)
+                except cache_backends.CacheUnavailableError as e:
+                    print(f"Warning: {e}", file=sys.stderr)
+        finally:
+            if leased:
+                cache.release_lease(cache_key)
 
     return data
 
 
+# Takes the scrape lease for this cache key, or if another runner already has it, waits for that runner to put its
+# result in the cache.  Returns (data, leased): data if someone else's scrape finished, otherwise leased says whether
+# we now hold the lease (we don't if the other runner held it for longer than SCRAPE_LEASE_TTL, or if the cache can't
+# be reached, in which case we just scrape without one).
+def claim_or_wait_for_scrape(cache, cache_key):
+    deadline = time.monotonic() + SCRAPE_LEASE_TTL
+    waiting = False
+    while True:
+        try:
+            leased = cache.acquire_lease(cache_key, SCRAPE_LEASE_TTL)
+        except cache_backends.CacheUnavailableError as e:
+            print(f"Warning: {e}", file=sys.stderr)
+            return None, False
+        if leased:
+            # the previous holder may have finished between our cache read and taking the lease
+            data = cache.get(cache_key, CACHE_TTL)
+            if data is not None:
+                cache.release_lease(cache_key)
+            return data, data is None
+
+        if not waiting and config.is_verbose_mode():
+            print("Another runner is scraping the console, waiting for its result...")
+        waiting = True
+        if time.monotonic() >= deadline:
+            return None, False
+        time.sleep(SCRAPE_LEASE_POLL)
+        data = cache.get(cache_key, CACHE_TTL)
+        if data is not None:
+            return data, False
+
+
+# returns the cached enablement data if there is a cache entry younger than CACHE_TTL, otherwise None.  This never
+# touches the AWS CLI or the browser, so it's the fast path for anything that only needs to read statuses.
+def read_fresh_cache(args):
+    cache_key = namespaced_cache_key(args)
+    if cache_key is None:
+        return None
+    try:
+        cache = cache_backends.get_cache_backend(config.get_cache_spec())
+    except cache_backends.CacheUnavailableError as e:
+        print(f"Warning: not using the cache: {e}", file=sys.stderr)
+        return None
+    return cache.get(cache_key, CACHE_TTL)
+
+
 # this is the main entry point for the list-foundation-models-with-enablement-status command
 def list_foundation_model_enablement_status(args):
     data = get_foundation_model_enablement_status(args)
+
+    # Narrow down by provider and/or access status if asked to
+    if args.provider or args.status:
+        model_index = catalog.CatalogIndex(data)
+        selected = model_index.model_data.get("modelSummaries", [])
+        if args.provider:
+            selected = model_index.with_provider(args.provider)
+        if args.status:
+            wanted_ids = {m["modelId"] for m in model_index.with_status(args.status)}
+            selected = [m for m in selected if m["modelId"] in wanted_ids]
+        data = dict(data, modelSummaries=selected)
+
     # Output the final data
     output_results(data, args.output)
 
@@ -300,46 +554,111 @@ def generate_cache_key(args):
     return hashlib.sha256(key_string.encode()).hexdigest()
 
 
-# this is used by the caching behavior inside get_foundation_model_enablement_status().... nothing important to see here
-def clean_old_cache_files():
-    now = time.time()
-    for file in CACHE_DIR.iterdir():
-        if file.is_file() and (now - file.stat().st_mtime) > CACHE_TTL:
-            file.unlink()
+# the account ID the cache and the journal are namespaced by, if it can be had without logging in: the one we were told
+# about (see credentials.known_account_id()), or with --login-method federation and nothing explicit, the account the
+# AWS credentials belong to, since that's where federated sign-in lands.  None if neither is known.
+def namespace_account_id():
+    account_id = credentials.known_account_id()
+    if account_id is None and config.get_login_method() == "federation":
+        import federation
+
+        account_id = federation.get_caller_account_id()
+    return account_id
+
+
+# cache entries are shared by everyone working on the same account and region, whatever their working directory.  The
+# account ID has to be known up front (see namespace_account_id()); without it there's no telling whose entries are
+# whose, so this returns None and the cache isn't used at all.
+def namespaced_cache_key(args):
+    account_id = namespace_account_id()
+    if account_id is None:
+        return None
+    return f"{account_id}/{AWS_REGION}/{generate_cache_key(args)}"
+
+
+# finds the catalog entries matching any of the requested names or IDs (case-insensitive).  Returns the matches, and
+# the requested names that didn't match anything.
+def find_model_summaries(requested, model_index):
+    matches = []
+    not_found = []
+    for name in requested:
+        found = model_index.find(name)
+        if found:
+            matched_ids = {m["modelId"] for m in matches}
+            matches.extend(m for m in found if m["modelId"] not in matched_ids)
+        else:
+            not_found.append(name)
+    return matches, not_found
+
+
+# maps an access status string to the get-model-status exit code
+def status_exit_code(status):
+    return STATUS_EXIT_CODES.get(str(status).lower(), EXIT_UNKNOWN)
+
+
+# this is the main entry point for the get-model-status command.  It answers from a fresh cache entry when there is
+# one, otherwise it logs in and scrapes only the requested rows through the console's table filter.  The partial
+# scrape is not written back to the cache, since the cache always holds the whole catalog.
+def get_model_status(args):
+    data = None
+    if args.no_cache:
+        metrics.inc("bedrock_cli_cache_requests_total", {"result": "bypass"})
+    else:
+        data = read_fresh_cache(args)
+        metrics.inc("bedrock_cli_cache_requests_total", {"result": "hit" if data is not None else "miss"})
+        if data is not None and config.is_verbose_mode():
+            print("Answering from cache")
+
+    if data is None:
+        model_index = catalog.CatalogIndex(load_model_data())
+        matches, not_found = find_model_summaries(args.models, model_index)
+        if matches:
+            driver = login_to_console(MAIN_AWS_SCREEN_URL)
+            try:
+                model_names = list(dict.fromkeys(m["modelName"] for m in matches))
+                access_status = scrape_access_status_for_models(driver, model_names)
+            except Exception as e:
+                # exit 13 means the console doesn't know the status; a scrape that broke is an error like any other
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+            finally:
+                driver.quit()
+            model_index.apply_access_status(access_status)
+    else:
+        matches, not_found = find_model_summaries(args.models, catalog.CatalogIndex(data))
+
+    for name in not_found:
+        print(f"Model {name} not found in the foundation model catalog", file=sys.stderr)
 
+    output_results({"modelSummaries": matches}, args.output)
 
-# this code just retrieves the current enablement status for a given model.  It is used primarily to make sure that
-# the user isn't trying to enable something that's in the wrong status
-def get_model_access_status(model_name, model_data):
-    # Normalize the search name for case-insensitive matching
-    target_name = model_name.lower()
+    exit_codes = [status_exit_code(m.get("accessStatus", "Unknown")) for m in matches]
+    if not_found:
+        exit_codes.append(EXIT_UNKNOWN)
+    sys.exit(max(exit_codes))
 
-    # Search through the model summaries
-    for model in model_data.get("modelSummaries", []):
-        # Check if the normalized model name matches
-        if model.get("modelName", "").lower() == target_name:
-            # Return the access status, defaulting to "Unknown" if not present
-            return model.get("accessStatus", "Unknown")
 
-    # Return "Unknown" if the model name was not found
-    return "Unknown"
+# this code just retrieves the current enablement status for a given model (by name or model ID).  It is used
+# primarily to make sure that the user isn't trying to enable something that's in the wrong status.  Raises
+# catalog.AmbiguousModelError if the name covers versions with different statuses.
+def get_model_access_status(model_name, model_index):
+    return model_index.status_of(model_name)
 
 
-# this is just conditional Selenium code that fills a field if it exists, otherwise it does nothing.  It's used for
-# optional fields that may or may not be present on the screen
+# fills a field if it exists, otherwise it does nothing.  It's used for optional fields that may or may not be present
+# on the screen.  Goes through the page helper library, so it's one round trip whether or not the field is there.
 def fill_text_field_if_exists(driver, field_name, text_value):
-    # Attempt to find the text field
-    fields = driver.find_elements(By.NAME, field_name)
+    import page_helpers
 
-    # Only fill in the first matching field, if any
-    if fields:
-        field = fields[0]
-        field.clear()
-        field.send_keys(text_value)
+    result = page_helpers.call(driver, "fillField", field_name, text_value)
+    if config.is_verbose_mode() and not result.get("found"):
+        print(f"No {field_name} field on this page")
 
 
 # this code just checks a checkbox on the screen for a given model
 def click_checkbox_for_model_row(driver, model_name):
+    from selenium.webdriver.common.by import By
+
     if config.is_verbose_mode():
         print("Searching table...")
     rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
@@ -365,85 +684,29 @@ def click_checkbox_for_model_row(driver, model_name):
 
 # this is some serious hackery right here... because AWS uses some weird UI library, you can't just select a drop down,
 # and there's a drop down for "industry name".  This code sets that industry name to "Other" and then fills in
-# whatever the user provided in the text field for their industry.  This was done to simplify the code, which obviously
-# wasn't that simple because of how AWS handles drop downs.
-#
-# Basically, since we can't count on the Selenium WebDriver primitives to work with this framework that AWS used, we
-# have to inject a bunch of javascript into the browser document context, and let it do all the work, which is what this
-# code does... and their library has some really weird requirements, like a mouse has to hover over their fake drop down
-# before clicking on it, so we have to simulate a mouse down, mouse up, and then click event.
-#
-# Then for the click boxes for internal or external users, we have to do more hackery, where we set a quarter second
-# wait after we've set the Industry fields before clicking the checkboxes.
+# whatever the user provided in the text field for their industry, then ticks the internal / external users boxes.
 #
-# It works, but it's not pretty.  Woe unto you if you end up here having to try to debug this.
+# Since we can't count on the Selenium WebDriver primitives to work with this framework that AWS used, the work is done
+# in the page by the fillUseCaseForm helper (see page_helpers.py), which simulates the mouse over / down / up / click
+# their drop down needs, and waits for each piece of the form to appear rather than for a fixed amount of time.  It
+# reports back whether it worked, so a form that didn't get filled in fails here instead of at submit.
 def click_dropdown_option(driver, industry_name, check_internal, check_external):
-    dropdown_js = """
-    function clickDropdownOption(industryName, checkInternal, checkExternal) {
-        const optionText = "Other";
-
-        function clickElement(element) {
-            const rect = element.getBoundingClientRect();
-            ["mouseover", "mousedown", "mouseup", "click"].forEach(type => {
-                element.dispatchEvent(new MouseEvent(type, {
-                    bubbles: true,
-                    cancelable: true,
-                    clientX: rect.left + rect.width / 2,
-                    clientY: rect.top + rect.height / 2,
-                    view: window
-                }));
-            });
-        }
-
-        const button = document.querySelector("button[id^='formField:']");
-        if (!button) return;
-        clickElement(button);
-
-        new MutationObserver((mutations, observer) => {
-            for (const mutation of mutations) {
-                for (const node of mutation.addedNodes) {
-                    if (node.nodeType === 1 && node.getAttribute("role") === "option" && node.textContent.trim().toLowerCase().includes(optionText.toLowerCase())) {
-                        clickElement(node);
-                        observer.disconnect();
-
-                        setTimeout(() => {
-                            if (industryName) {
-                                const input_industry = document.getElementsByName("otherIndustry")[0];
-                                if (input_industry) {
-                                    input_industry.focus();
-                                    input_industry.setRangeText(industryName);
-                                    input_industry.dispatchEvent(new InputEvent("input", { bubbles: true }));
-                                    input_industry.dispatchEvent(new Event("change", { bubbles: true }));
-                                }
-                            }
-                            if (checkInternal) {
-                                const internalCheckbox = document.getElementsByName("intendedUsers.internal")[0];
-                                if (internalCheckbox && !internalCheckbox.checked) internalCheckbox.click();
-                            }
-                            if (checkExternal) {
-                                const externalCheckbox = document.getElementsByName("intendedUsers.external")[0];
-                                if (externalCheckbox && !externalCheckbox.checked) externalCheckbox.click();
-                            }
-                        }, 250);
-
-                        return;
-                    }
-                }
-            }
-        }).observe(document.body, { childList: true, subtree: true });
-    }
-    """
-
-    # Call the function with runtime parameters
-    js_call = dropdown_js + f"\nclickDropdownOption('{industry_name}', {str(check_internal).lower()}, {str(check_external).lower()})"
+    import page_helpers
 
-    # print("shipping:\n\n" + js_call)
-    driver.execute_script(js_call)
+    timeout = config.get_timeout("wizard_step")
+    start = time.monotonic()
+    result = page_helpers.call(driver, "fillUseCaseForm", industry_name, check_internal, check_external,
+                               int(timeout * 1000), script_timeout=timeout * 4 + 5)
+    if not result.get("ok"):
+        raise ValueError(f"Unable to fill in the use case form: {result.get('error')}")
+    config.record_latency("wizard_step", time.monotonic() - start)
 
 
 # this is the code that handles all the "special fields" required by the Anthropic models (why in heaven's name did they
 # do this?  What an utter waste of everyone's time and talent...)
 def handle_special_fields(driver, args):
+    import preflight
+
     if args.company_name is None:
         fill_text_field_if_exists(driver, "companyName",
                                   "Unknown Company")  # should really never hit this, but if the text box appears and they didn't select a Claude model this would handle it
@@ -466,20 +729,9 @@ def handle_special_fields(driver, args):
     if args.industry is not None:
         industry_name = args.industry
 
-    check_internal = True
-    check_external = True
-
-    if args.internal_employees is None:
-        check_internal = False
-    else:
-        if args.internal_employees == str(0) or str(args.internal_employees).lower() == "false":
-            check_internal = False
-
-    if args.external_users is None:
-        check_external = False
-    else:
-        if args.external_users == str(0) or str(args.external_users).lower() == "false":
-            check_internal = False
+    # preflight has already rejected anything parse_flag() can't read
+    check_internal = preflight.parse_flag(args.internal_employees) is True
+    check_external = preflight.parse_flag(args.external_users) is True
 
     if check_internal is False and check_external is False:
         check_internal = True  # at least one must be true
@@ -487,69 +739,162 @@ def handle_special_fields(driver, args):
     click_dropdown_option(driver, industry_name, check_internal, check_external)  # magic and mayhem here... beware.
 
 
-# this is the main entry point for the enable-foundation-model command line functionality.
+# this is the main entry point for the enable-foundation-model command line functionality.  Every model named is one
+# item in the job journal (see journal.py).  Without --resume they all start over as pending; with it, models the
+# journal already has as confirmed or submitted are skipped and only the rest are tried.  (A submitted model can't be
+# re-checked cheaply: only a fresh scrape shows its new status.)  Exits with the lowest non-zero exit code
+# of the models that didn't succeed, so 1 (a bad run) wins over 2 (a model not available to request).
 def enable_foundation_model(args):
     if not args.model_name:
         print("Error: The --model-name parameter is required.")
         sys.exit(1)
 
-    # If the model name contains 'Claude', make all optional parameters required
-    if "Claude" in args.model_name:
-        required_fields = [
-            "company_name", "company_website_url", "industry",
-            "internal_employees", "external_users", "use_case_description"
-        ]
-        missing_fields = [field for field in required_fields if not getattr(args, field)]
-        if missing_fields:
-            print(
-                f"Error: The following parameters are required when the model name contains 'Claude': {', '.join(missing_fields)}")
-            sys.exit(1)
+    if args.preflight_only:
+        # a dry run records nothing, so it needs neither the journal file nor the account its items are keyed by
+        account_id = None
+        jobs = journal.Journal(None)
+    else:
+        # journal items are per account, so the account ID is needed up front here; asking for it now also lets the
+        # cache be used for the rest of the run
+        account_id = namespace_account_id()
+        if account_id is None:
+            try:
+                account_id = credentials.resolve(["account_id"])["account_id"]
+            except credentials.CredentialsUnavailableError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        jobs = journal.Journal(args.journal)
+
+    exit_codes = []
+    for model_name in args.model_name:
+        key = journal.item_key(account_id, AWS_REGION, model_name)
+        state = jobs.state_of(key)
+        if args.resume and state in (journal.CONFIRMED, journal.SUBMITTED):
+            print(f"Skipping {model_name}: already {state} in {args.journal}")
+            continue
+        model_args = argparse.Namespace(**vars(args))
+        model_args.model_name = model_name
+        exit_codes.append(enable_one_foundation_model(model_args, jobs, key))
+
+    failures = [code for code in exit_codes if code != 0]
+    if failures:
+        sys.exit(min(failures))
+
+
+# records what the console's current access status means for a journal item, and returns True if there's nothing left
+# to do for it.  This is what makes re-running a batch safe: a model that's already granted or in progress is never
+# submitted twice.
+def reconcile_with_access_status(jobs, key, model_name, status):
+    code = status_exit_code(status)
+    if code == EXIT_ACCESS_GRANTED:
+        jobs.mark(key, journal.CONFIRMED, status=status)
+    elif code == EXIT_IN_PROGRESS:
+        jobs.mark(key, journal.SUBMITTED, status=status)
+    else:
+        return False
+    print(f"Model {model_name} needs nothing more.  Status = {status}")
+    return True
+
 
+# drops the cached catalog after a request is submitted, since it still shows the model as available to request.  Left
+# in place, a re-run within CACHE_TTL would submit the same model again.
+def forget_cached_status(args):
+    cache_key = namespaced_cache_key(args)
+    if cache_key is None:
+        return
+    try:
+        cache_backends.get_cache_backend(config.get_cache_spec()).delete(cache_key)
+    except cache_backends.CacheUnavailableError as e:
+        print(f"Warning: {e}", file=sys.stderr)
+
+
+# runs one model through preflight, the status check and the wizard, keeping its journal item up to date, and returns
+# the exit code for it
+def enable_one_foundation_model(args, jobs, key):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    import chrome_install_mgr
+    import preflight
+
+    # Reject doomed runs before any browser is launched (see preflight.py)
+    cached_models = read_fresh_cache(args)
+    model_index = catalog.CatalogIndex(cached_models) if cached_models is not None else None
+    if model_index is not None:
+        try:
+            cached_status = model_index.status_of(args.model_name)
+        except catalog.AmbiguousModelError:
+            cached_status = None  # reported by preflight
+        if cached_status is not None and reconcile_with_access_status(jobs, key, args.model_name, cached_status):
+            return 0
+    problems = preflight.run_preflight(args, model_index)
+    for message, _ in problems:
+        print(f"Error: {message}")
+    if problems:
+        jobs.mark(key, journal.FAILED, error="; ".join(message for message, _ in problems))
+        return min(exit_code for _, exit_code in problems)
+    if args.preflight_only:
+        print(f"Preflight checks passed for {args.model_name}")
+        return 0
+
+    jobs.mark(key, journal.PENDING)
     if config.is_verbose_mode():
         print(f"Checking foundation model: '{args.model_name}' activation status")
 
     current_models = get_foundation_model_enablement_status(args)
-    model_status = get_model_access_status(args.model_name, current_models)
+    try:
+        model_status = get_model_access_status(args.model_name, catalog.CatalogIndex(current_models))
+    except catalog.AmbiguousModelError as e:
+        print(f"Error: {e}")
+        jobs.mark(key, journal.FAILED, error=str(e))
+        return 1
 
     if config.is_verbose_mode():
         print(f"Model status: {model_status}")
+    if reconcile_with_access_status(jobs, key, args.model_name, model_status):
+        return 0
     if model_status != "Available to request":
-        print(f"Model {args.model_name} is not in 'Available to request' status.  Status = {model_status}")
-        sys.exit(2)
+        message = f"Model {args.model_name} is not in 'Available to request' status.  Status = {model_status}"
+        print(message)
+        jobs.mark(key, journal.FAILED, error=message, status=model_status)
+        return 2
 
+    driver = None
     try:
         driver = login_to_console(MAIN_AWS_SCREEN_URL)
-        if config.is_verbose_mode():
-            print("Navigating to bedrock model list")
-        driver.get(MODEL_LIST_URL)
-        chrome_install_mgr.wait_for_browser_settle(driver)
+        navigate_to_model_list(driver)
 
         if config.is_verbose_mode():
             print("Waiting for table to appear...")
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table")))
+        chrome_install_mgr.wait_until(driver, "model_table", EC.presence_of_element_located((By.CSS_SELECTOR, "table")))
 
         if config.is_verbose_mode():
             print("Waiting for Enable Specific button...")
 
-        enable_specific_button = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable(
+        enable_specific_button = chrome_install_mgr.wait_until(
+            driver, "wizard_button", EC.element_to_be_clickable(
                 (By.XPATH, "//*[@data-testid='modify-button' or @data-testid='enable-specific-button']")
             )
         )
 
         driver.execute_script("arguments[0].click();", enable_specific_button)
-        time.sleep(3)
+        chrome_install_mgr.wait_until(driver, "wizard_button", EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "table tbody tr input[type='checkbox']")
+        ))
 
         click_checkbox_for_model_row(driver, args.model_name)
 
-        next_button = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable(
+        next_button = chrome_install_mgr.wait_until(
+            driver, "wizard_button", EC.element_to_be_clickable(
                 (By.XPATH, "//button[.//text()[contains(., 'Next')]]")
             )
         )
 
         driver.execute_script("arguments[0].click();", next_button)
-        time.sleep(3)
+        try:
+            chrome_install_mgr.wait_until(driver, "wizard_step", EC.staleness_of(next_button), record_timeout=False)
+        except TimeoutException:
+            pass
 
         chrome_install_mgr.wait_for_browser_settle(driver)
 
@@ -571,8 +916,10 @@ def enable_foundation_model(args):
         while not back_at_access_screen and WaitCtr < 4:
             WaitCtr = WaitCtr + 1
             try:
-                submit_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Submit') or contains(., 'Next')]"))
+                submit_button = chrome_install_mgr.wait_until(
+                    driver, "wizard_step",
+                    EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Submit') or contains(., 'Next')]")),
+                    record_timeout=False
                 )
                 driver.execute_script("arguments[0].click();", submit_button)
             except:
@@ -580,10 +927,10 @@ def enable_foundation_model(args):
 
             enable_specific_button = None
             try:
-                enable_specific_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable(
+                enable_specific_button = chrome_install_mgr.wait_until(
+                    driver, "wizard_step", EC.element_to_be_clickable(
                         (By.XPATH, "//*[@data-testid='modify-button' or @data-testid='enable-specific-button']")
-                    )
+                    ), record_timeout=False
                 )
             except:
                 pass
@@ -595,17 +942,23 @@ def enable_foundation_model(args):
             raise ValueError(f"Unable to submit request to enable model {args.model_name}")
         else:
             print(f"Model {args.model_name} enablement request submitted")
-
+            jobs.mark(key, journal.SUBMITTED)
+            forget_cached_status(args)
 
     except Exception as e:
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        screenshot_path = f"error_screenshot_{timestamp}.png"
-        driver.save_screenshot(screenshot_path)
+        if driver is not None:
+            timestamp = time.strftime("%Y%m%d-%H%M%S")
+            screenshot_path = f"error_screenshot_{timestamp}.png"
+            driver.save_screenshot(screenshot_path)
         print(f"Error while scraping: {e}")
+        jobs.mark(key, journal.FAILED, error=str(e))
+        return 1
 
-    print(f"Enabling {args.model_name}")
-    time.sleep(5)
-    driver.quit()
+    finally:
+        if driver is not None:
+            driver.quit()
+
+    return 0
 
 
 def output_results(data, output_format):
@@ -624,11 +977,14 @@ def output_results(data, output_format):
             }
             for m in models
         ]
+        import pandas as pd
+        from tabulate import tabulate
+
         df = pd.DataFrame(table_data)
         print(tabulate(df, headers="keys", tablefmt="grid"))
     elif output_format == "text":
-        for item in data:
-            print("".join([f"{k}: {v}" for k, v in item.items()]))
+        for item in data.get("modelSummaries", []):
+            print("\n".join([f"{k}: {v}" for k, v in item.items()]))
             print()
     else:
         print(f"Error: Unsupported output format '{output_format}'")
@@ -649,6 +1005,68 @@ def main():
         help="Enable verbose output"
     )
 
+    parser.add_argument(
+        "--metrics-textfile",
+        default=os.environ.get("BEDROCK_CLI_METRICS_TEXTFILE"),
+        help="Add this run's metrics to a node-exporter textfile (e.g. /var/lib/node_exporter/bedrock_cli.prom)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=os.environ.get("BEDROCK_CLI_METRICS_PORT"),
+        help="Serve Prometheus metrics on http://0.0.0.0:<port>/metrics while the command runs"
+    )
+
+    parser.add_argument(
+        "--login-method",
+        choices=config.LOGIN_METHODS,
+        default=os.environ.get("BEDROCK_CLI_LOGIN_METHOD", "form"),
+        help="How to sign in to the console: 'form' fills in the sign-in page, 'federation' opens a federation\n"
+             "sign-in URL built from temporary AWS credentials (falls back to the form if it fails)"
+    )
+
+    parser.add_argument(
+        "--browser-backend",
+        choices=config.BROWSER_BACKENDS,
+        default=os.environ.get("BEDROCK_CLI_BROWSER_BACKEND", "selenium"),
+        help="'selenium' drives Chrome through ChromeDriver, 'cdp' talks to Chrome's DevTools protocol directly\n"
+             "(no ChromeDriver download needed)"
+    )
+    parser.add_argument(
+        "--cache",
+        default=os.environ.get("BEDROCK_CLI_CACHE", cache_backends.DEFAULT_CACHE),
+        help="Where to cache enablement statuses: dir:<path> (default dir:./cache), sqlite:<path>,\n"
+             "or http(s)://<key-value service url>"
+    )
+    parser.add_argument(
+        "--account",
+        default=None,
+        help="AWS account ID to sign in to.  Also namespaces the shared cache and the job journal; without it\n"
+             "(or AWS_ACCOUNT_ID, or account_id in the credentials file) the cache isn't used, except with\n"
+             "--login-method federation, which uses the AWS credentials' account.  Federated sign-in to a\n"
+             "different account falls back to the sign-in form"
+    )
+    parser.add_argument(
+        "--credentials-profile",
+        default=None,
+        help="Profile to read from the credentials file / keyring (default: BEDROCK_CLI_PROFILE or 'default')"
+    )
+    parser.add_argument(
+        "--mfa-method",
+        choices=config.MFA_METHODS,
+        default=os.environ.get("BEDROCK_CLI_MFA_METHOD", "auto"),
+        help="Where MFA codes come from: 'totp' generates them from a stored seed, 'command' runs\n"
+             "BEDROCK_CLI_MFA_COMMAND, 'prompt' asks.  'auto' (default) picks the first one that's set up"
+    )
+    parser.add_argument(
+        "--timeout",
+        action="append",
+        default=[],
+        metavar="STEP=SECONDS",
+        help="Override a learned timeout, e.g. --timeout settle=10 (may be repeated).  Steps:\n"
+             + ", ".join(config.DEFAULT_TIMEOUTS)
+    )
+
     subparsers = parser.add_subparsers(dest="command")
 
     # list-foundation-model-enablement-status command
@@ -668,8 +1086,50 @@ def main():
         help="Force cache refresh",
         action="store_true"
     )
+    list_parser.add_argument(
+        "--provider",
+        required=False,
+        help="Only list models from this provider (e.g. Anthropic)"
+    )
+    list_parser.add_argument(
+        "--status",
+        required=False,
+        help="Only list models with this access status (e.g. \"Access granted\")"
+    )
     list_parser.set_defaults(func=list_foundation_model_enablement_status)
 
+    # get-model-status command
+    status_parser = subparsers.add_parser(
+        "get-model-status",
+        help="Get the enablement status of one or more models",
+        description="Get the enablement status of one or more models.\n\n"
+                    "Exit codes (the highest one wins when several models are given):\n"
+                    f"  {EXIT_ACCESS_GRANTED}   Access granted\n"
+                    f"  {EXIT_IN_PROGRESS}  In progress / access requested\n"
+                    f"  {EXIT_AVAILABLE_TO_REQUEST}  Available to request\n"
+                    f"  {EXIT_ACCESS_DENIED}  Access denied / unavailable\n"
+                    f"  {EXIT_UNKNOWN}  Unknown status or model not found",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    status_parser.add_argument(
+        "models",
+        nargs="+",
+        help="Model names or model IDs"
+    )
+    status_parser.add_argument(
+        "--output",
+        choices=["json", "table", "text"],
+        default="json",
+        help="Output format (json, table, text)"
+    )
+    status_parser.add_argument(
+        "--no-cache",
+        required=False,
+        help="Ignore the cache and scrape the console",
+        action="store_true"
+    )
+    status_parser.set_defaults(func=get_model_status)
+
     # enable-foundation-model command
     enable_parser = subparsers.add_parser(
         "enable-foundation-model",
@@ -678,7 +1138,8 @@ def main():
     enable_parser.add_argument(
         "--model-name",
         required=True,
-        help="Name of the foundation model to enable"
+        nargs="+",
+        help="Name of the foundation model to enable (several may be given, for a batch)"
     )
     enable_parser.add_argument(
         "--company-name",
@@ -716,45 +1177,82 @@ def main():
         default="json",
         help="Output format (json, table, text)"
     )
+    enable_parser.add_argument(
+        "--preflight-only",
+        required=False,
+        help="Only run the preflight checks (no browser, no journal), and exit non-zero if the run would fail",
+        action="store_true"
+    )
+    enable_parser.add_argument(
+        "--journal",
+        default=os.environ.get("BEDROCK_CLI_JOURNAL", journal.DEFAULT_JOURNAL),
+        help="Job journal recording each model's progress (default ./journal.json)"
+    )
+    enable_parser.add_argument(
+        "--resume",
+        required=False,
+        help="Skip models the journal already has as confirmed or submitted, and retry only the rest",
+        action="store_true"
+    )
     enable_parser.set_defaults(func=enable_foundation_model)
 
     args = parser.parse_args()
     config.set_verbose_mode(args.verbose)
-
-    # make sure necessary environment variables exist
-    global AWS_ACCOUNT_ID
-    AWS_ACCOUNT_ID = os.environ.get("AWS_ACCOUNT_ID")
-    if AWS_ACCOUNT_ID is None:
-        AWS_ACCOUNT_ID = input("Type the account number you are using: ")
-    else:
-        if config.is_verbose_mode():
-            print(f"Found AWS_ACCOUNT_ID in environment variables: {AWS_ACCOUNT_ID}")
-    global IAM_ADMIN_USER
-    IAM_ADMIN_USER = os.environ.get("IAM_ADMIN_USER")
-    if IAM_ADMIN_USER is None:
-        IAM_ADMIN_USER = input("Type the admin user id you are using: ")
-    else:
-        if config.is_verbose_mode():
-            print(f"Found IAM_ADMIN_USER in environment variables: {IAM_ADMIN_USER}")
-    global IAM_ADMIN_PWD
-    IAM_ADMIN_PWD = os.environ.get("IAM_ADMIN_PWD")
-    if IAM_ADMIN_PWD is None:
-        IAM_ADMIN_PWD = getpass.getpass("Type the password for user: " + IAM_ADMIN_USER + "/" + AWS_ACCOUNT_ID + "> ")
-    else:
-        if config.is_verbose_mode():
-            half_len = int((len(IAM_ADMIN_PWD) / 2) + 1)
-            partially_hidden_pwd = '*' * half_len
-            partially_hidden_pwd = partially_hidden_pwd + IAM_ADMIN_PWD[-half_len:]
-            print(f"Found IAM_ADMIN_PWD in an environment variable: {partially_hidden_pwd}")
+    config.set_login_method(args.login_method)
+    config.set_browser_backend(args.browser_backend)
+    try:
+        cache_backends.parse_cache_spec(args.cache)
+    except ValueError as e:
+        parser.error(f"--cache: {e}")
+    config.set_cache_spec(args.cache)
+    config.set_credentials_profile(args.credentials_profile)
+    config.set_account_id(args.account)
+    config.set_mfa_method(args.mfa_method)
+    for override in args.timeout:
+        step, _, seconds = override.partition("=")
+        try:
+            config.set_timeout_override(step.strip(), float(seconds))
+        except ValueError as e:
+            parser.error(f"--timeout {override}: {e}")
 
     if config.is_verbose_mode():
         print("Verbose mode enabled.")
 
+    if args.metrics_port is not None:
+        metrics.start_http_server(int(args.metrics_port))
+
     if hasattr(args, "func"):
-        args.func(args)
+        run_command(args)
     else:
         parser.print_help()
 
 
+# runs the selected command, recording how long it took and how it ended.  The metrics textfile is written on the way
+# out no matter how the command exits, since get-model-status exits with a status code on purpose.
+def run_command(args):
+    command_start = time.monotonic()
+    exit_code = "error"
+    try:
+        args.func(args)
+        exit_code = "0"
+    except SystemExit as e:
+        exit_code = str(e.code if isinstance(e.code, int) else 1)
+        raise
+    finally:
+        metrics.observe("bedrock_cli_command_duration_seconds", time.monotonic() - command_start,
+                        {"command": args.command})
+        metrics.inc("bedrock_cli_command_runs_total", {"command": args.command, "exit_code": exit_code})
+        metrics.set_gauge("bedrock_cli_last_run_timestamp_seconds", time.time(), {"command": args.command})
+        try:
+            config.save_timing_history()
+        except OSError as e:
+            print(f"Unable to save timing history {config.TIMING_HISTORY_FILE}: {e}", file=sys.stderr)
+        if args.metrics_textfile:
+            try:
+                metrics.write_textfile(args.metrics_textfile)
+            except OSError as e:
+                print(f"Unable to write metrics textfile {args.metrics_textfile}: {e}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+# benchmark_browsers.py
+#
+# Compares the selenium and cdp browser backends (see browser.py) on the kind of work a real run does, against a local
+# page so AWS isn't involved:
+#
+#   launch         starting Chrome (and chromedriver, for selenium) until the first command can be sent
+#   navigate       loading a page with a model-access-sized table
+#   round trip     one trivial execute_script() call, averaged over --iterations calls
+#   table scrape   reading every row of the table the way read_access_status_rows() does
+#   quit           shutting the browser down
+#
+# python benchmark_browsers.py [--iterations 200] [--rows 150] [--backends selenium cdp] [--show-browser]
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from tabulate import tabulate
+
+import browser
+import config
+import page_helpers
+
+
+def build_test_page(rows):
+    body = "".join(
+        f"<tr><td>Model {i}\nProvider {i % 7}</td><td>{'Access granted' if i % 3 else 'Available to request'}</td>"
+        f"<td><input type='checkbox'></td></tr>"
+        for i in range(rows)
+    )
+    page = Path(tempfile.mkdtemp()) / "model_access.html"
+    page.write_text(f"<html><body><table><thead><tr><th>Model</th><th>Status</th></tr></thead>"
+                    f"<tbody>{body}</tbody></table></body></html>")
+    return page.as_uri()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def scrape_table(driver):
+    statuses = {}
+    for cells in page_helpers.call(driver, "extractTable", "table tbody tr")["rows"]:
+        if len(cells) > 1:
+            statuses[cells[0].split("\n")[0].strip()] = cells[1].split("\n")[0].strip()
+    return statuses
+
+
+def benchmark_backend(backend, page_url, iterations, headless):
+    launch_time, driver = timed(lambda: browser.launch_browser(headless, backend))
+    try:
+        navigate_time, _ = timed(lambda: driver.get(page_url))
+
+        round_trips = []
+        for i in range(iterations):
+            elapsed, _ = timed(lambda: driver.execute_script("return arguments[0] + 1;", i))
+            round_trips.append(elapsed)
+
+        scrape_time, statuses = timed(lambda: scrape_table(driver))
+    finally:
+        quit_time, _ = timed(driver.quit)
+
+    return {
+        "Backend": backend,
+        "Launch (s)": round(launch_time, 3),
+        "Navigate (ms)": round(navigate_time * 1000, 1),
+        "Round trip mean (ms)": round(statistics.mean(round_trips) * 1000, 2),
+        "Round trip p95 (ms)": round(sorted(round_trips)[int(len(round_trips) * 0.95) - 1] * 1000, 2),
+        "Table scrape (ms)": round(scrape_time * 1000, 1),
+        "Rows read": len(statuses),
+        "Quit (s)": round(quit_time, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the selenium and cdp browser backends")
+    parser.add_argument("--iterations", type=int, default=200, help="execute_script() round trips to time")
+    parser.add_argument("--rows", type=int, default=150, help="rows in the test table")
+    parser.add_argument("--backends", nargs="+", choices=config.BROWSER_BACKENDS, default=config.BROWSER_BACKENDS)
+    parser.add_argument("--show-browser", action="store_true", help="Run Chrome with a visible window")
+    args = parser.parse_args()
+
+    page_url = build_test_page(args.rows)
+    results = [benchmark_backend(backend, page_url, args.iterations, not args.show_browser)
+               for backend in args.backends]
+    print(tabulate(results, headers="keys", tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
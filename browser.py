@@ -0,0 +1,552 @@
+# browser.py
+#
+# Everything that drives the browser (login_to_console(), scrape_access_status(), the enablement wizard) gets its
+# browser from launch_browser() here, and only uses the small slice of the Selenium WebDriver API listed below.  That
+# slice is implemented by two backends:
+#
+#   selenium  the default.  Python -> chromedriver (HTTP) -> Chrome DevTools.  Needs a ChromeDriver binary that matches
+#             the installed Chrome, which chrome_install_mgr downloads if there isn't one on the PATH.
+#   cdp       launches Chrome itself and talks the Chrome DevTools Protocol straight over Chrome's websocket, so there's
+#             no chromedriver to download and one less hop on every command.
+#
+# The WebDriver slice:  driver.get(), driver.current_url, driver.find_element(s)(), driver.execute_script(),
+# driver.execute_async_script(), driver.set_script_timeout(), driver.execute_cdp_cmd(), driver.save_screenshot(),
+# driver.quit(), and on elements .click(), .clear(), .send_keys(), .text, .is_displayed(), .is_enabled(),
+# .get_attribute() and .find_element(s)().  WebDriverWait and expected_conditions work against either backend, since
+# the cdp backend raises the same Selenium exceptions.
+#
+# One difference: execute_script() on the cdp backend returns values by JSON, so a script that returns DOM nodes gets
+# back plain dicts rather than elements.  Use find_element(s) for elements.
+#
+# Every browser launched here has the page_helpers library installed, so window.__bedrockCli is there in every
+# document it loads.
+
+import base64
+import json
+import logging
+import os
+import shutil
+import socket
+import ssl
+import struct
+import subprocess
+import tempfile
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.common.exceptions import (JavascriptException, NoSuchElementException, StaleElementReferenceException,
+                                        TimeoutException, WebDriverException)
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.remote_connection import LOGGER
+
+import chrome_install_mgr
+import config
+import page_helpers
+
+LOGGER.setLevel(logging.ERROR)
+
+# arguments shared by both backends when running headless
+HEADLESS_ARGUMENTS = [
+    "--headless",
+    "--log-level=1",
+    "--no-sandbox",
+    "--silent",
+    "--disable-dev-shm-usage",
+    "--window-size=1920,1080",
+]
+
+CDP_COMMAND_TIMEOUT = 60  # seconds to wait for Chrome to answer a single DevTools command
+# an async script's answer can take as long as its script timeout; this is how much longer the socket waits for it
+SCRIPT_ANSWER_MARGIN = 10
+DEFAULT_SCRIPT_TIMEOUT = 30
+
+
+def launch_browser(headless=True, backend=None):
+    if backend is None:
+        backend = config.get_browser_backend()
+    if config.is_verbose_mode():
+        print(f"Launching Chrome with the {backend} backend")
+    if backend == "cdp":
+        driver = CdpDriver(headless)
+    else:
+        driver = launch_selenium(headless)
+    page_helpers.install(driver)
+    return driver
+
+
+def launch_selenium(headless):
+    chrome_driver_path = chrome_install_mgr.ensure_chromedriver_installed()
+    options = webdriver.ChromeOptions()
+    options.add_argument(f"--user-data-dir={tempfile.mkdtemp()}")
+    options.add_argument("--incognito")
+    if headless:
+        for argument in HEADLESS_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_argument("--remote-debugging-port=0")
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+        options.headless = True
+
+    service_args_l = ["--silent"]
+    service = Service(chrome_driver_path, service_args=service_args_l, log_output="me.log")
+
+    return webdriver.Chrome(service=service, options=options)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Minimal websocket client (RFC 6455), just enough to talk to Chrome's DevTools endpoint without adding a dependency.
+# Text frames only, client-to-server frames masked as the RFC requires.
+# ----------------------------------------------------------------------------------------------------------------------
+class WebSocket:
+    def __init__(self, url, timeout=CDP_COMMAND_TIMEOUT):
+        parsed = urlparse(url)
+        port = parsed.port or (443 if parsed.scheme == "wss" else 80)
+        sock = socket.create_connection((parsed.hostname, port), timeout=timeout)
+        if parsed.scheme == "wss":
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname)
+        self.sock = sock
+        self.buffer = b""
+        self.fragments = b""
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parsed.path + (("?" + parsed.query) if parsed.query else "")
+        request = (f"GET {path} HTTP/1.1\r\n"
+                   f"Host: {parsed.hostname}:{port}\r\n"
+                   "Upgrade: websocket\r\n"
+                   "Connection: Upgrade\r\n"
+                   f"Sec-WebSocket-Key: {key}\r\n"
+                   "Sec-WebSocket-Version: 13\r\n\r\n")
+        self.sock.sendall(request.encode())
+
+        while b"\r\n\r\n" not in self.buffer:
+            self.buffer += self._recv_some()
+        header, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        status_line = header.split(b"\r\n", 1)[0]
+        if b" 101 " not in status_line + b" ":
+            raise WebDriverException(f"DevTools websocket handshake failed: {status_line.decode(errors='replace')}")
+
+    def _recv_some(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise WebDriverException("DevTools websocket closed by the browser")
+        return chunk
+
+    # takes one whole frame off the front of the buffer as (first byte, payload), or returns None if it hasn't all
+    # arrived yet.  Nothing is taken until the whole frame is there, so a recv() that times out part way through a
+    # frame leaves the stream intact for the next one.
+    def _take_frame(self):
+        if len(self.buffer) < 2:
+            return None
+        first, second = self.buffer[0], self.buffer[1]
+        length = second & 0x7F
+        offset = 2
+        if length == 126:
+            if len(self.buffer) < 4:
+                return None
+            length = struct.unpack("!H", self.buffer[2:4])[0]
+            offset = 4
+        elif length == 127:
+            if len(self.buffer) < 10:
+                return None
+            length = struct.unpack("!Q", self.buffer[2:10])[0]
+            offset = 10
+        mask = None
+        if second & 0x80:
+            if len(self.buffer) < offset + 4:
+                return None
+            mask = self.buffer[offset:offset + 4]
+            offset += 4
+        if len(self.buffer) < offset + length:
+            return None
+        payload = self.buffer[offset:offset + length]
+        self.buffer = self.buffer[offset + length:]
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return first, payload
+
+    def _send_frame(self, opcode, payload):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 65536:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def send(self, text):
+        self._send_frame(0x1, text.encode())
+
+    # raises socket.timeout if no whole message arrives within the socket's timeout
+    def recv(self):
+        while True:
+            frame = self._take_frame()
+            if frame is None:
+                self.buffer += self._recv_some()
+                continue
+            first, payload = frame
+            opcode = first & 0x0F
+
+            if opcode == 0x8:
+                raise WebDriverException("DevTools websocket closed by the browser")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            self.fragments += payload
+            if first & 0x80:
+                message, self.fragments = self.fragments, b""
+                return message.decode()
+
+    def close(self):
+        try:
+            self._send_frame(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# CDP backend
+# ----------------------------------------------------------------------------------------------------------------------
+
+# runs in the page to locate elements the way Selenium's locator strategies do.  "this" is the element (or document)
+# to search under.
+FIND_ELEMENTS_JS = """
+function(by, value, many) {
+    const root = this;
+    let found = [];
+    if (by === "id") {
+        found = Array.from(root.querySelectorAll("#" + CSS.escape(value)));
+    } else if (by === "name") {
+        found = Array.from(root.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+    } else if (by === "css selector") {
+        found = Array.from(root.querySelectorAll(value));
+    } else if (by === "tag name") {
+        found = Array.from(root.getElementsByTagName(value));
+    } else if (by === "class name") {
+        found = Array.from(root.getElementsByClassName(value));
+    } else if (by === "link text" || by === "partial link text") {
+        found = Array.from(root.querySelectorAll("a")).filter(a => {
+            const text = a.innerText.trim();
+            return by === "link text" ? text === value : text.includes(value);
+        });
+    } else if (by === "xpath") {
+        const doc = root.ownerDocument || root;
+        const result = doc.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < result.snapshotLength; i++) found.push(result.snapshotItem(i));
+    } else {
+        throw new Error("bedrock-cli: unsupported locator " + by);
+    }
+    return many ? found : (found[0] || null);
+}
+"""
+
+# element functions throw this when the element has been removed from the page, which becomes a Selenium
+# StaleElementReferenceException so expected_conditions.staleness_of() works
+STALE_MARKER = "bedrock-cli:stale"
+STALE_CHECK_JS = f"if (!this.isConnected) throw new Error('{STALE_MARKER}');"
+
+
+class CdpDriver:
+    def __init__(self, headless=True):
+        self.user_data_dir = tempfile.mkdtemp()
+        self.script_timeout = DEFAULT_SCRIPT_TIMEOUT
+        self.events = []
+        self.next_id = 0
+
+        arguments = [
+            chrome_install_mgr.find_chrome_binary(),
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.user_data_dir}",
+            "--incognito",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ]
+        if headless:
+            arguments.extend(HEADLESS_ARGUMENTS)
+        arguments.append("about:blank")
+        self.process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        try:
+            port = self._wait_for_devtools_port()
+            self.socket = WebSocket(self._find_page_websocket(port))
+            self.execute_cdp_cmd("Page.enable", {})
+        except Exception:
+            self.quit()
+            raise
+
+    # Chrome writes the port it picked into DevToolsActivePort in the profile directory once it's listening
+    def _wait_for_devtools_port(self):
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + config.get_timeout("page_load")
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise WebDriverException(f"Chrome exited during startup with code {self.process.returncode}")
+            try:
+                with open(port_file, "r") as f:
+                    port = f.readline().strip()
+                if port:
+                    return int(port)
+            except (OSError, ValueError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutException("Chrome did not open its DevTools port")
+
+    def _find_page_websocket(self, port):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=CDP_COMMAND_TIMEOUT) as response:
+            targets = json.load(response)
+        for target in targets:
+            if target.get("type") == "page" and target.get("webSocketDebuggerUrl"):
+                return target["webSocketDebuggerUrl"]
+        raise WebDriverException("Chrome has no page target to attach to")
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # protocol plumbing
+    # ------------------------------------------------------------------------------------------------------------------
+    # waits up to timeout seconds for the answer.  If it times out, the answer may still turn up later; it's dropped
+    # then like any other answer whose id we're not waiting for.
+    def execute_cdp_cmd(self, cmd, cmd_args, timeout=CDP_COMMAND_TIMEOUT):
+        self.next_id += 1
+        command_id = self.next_id
+        self.socket.send(json.dumps({"id": command_id, "method": cmd, "params": cmd_args}))
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"{cmd} got no answer within {timeout}s")
+            self.socket.sock.settimeout(remaining)
+            try:
+                message = json.loads(self.socket.recv())
+            except socket.timeout:
+                raise TimeoutException(f"{cmd} got no answer within {timeout}s")
+            if message.get("id") == command_id:
+                if "error" in message:
+                    error = message["error"]
+                    text = error.get("message", "") + " " + str(error.get("data", ""))
+                    if "Could not find object" in text or "Cannot find context" in text:
+                        raise StaleElementReferenceException(text.strip())
+                    raise WebDriverException(f"{cmd} failed: {text.strip()}")
+                return message.get("result", {})
+            if "method" in message:
+                self.events.append(message)
+
+    def _wait_for_event(self, method, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            for event in self.events:
+                if event["method"] == method:
+                    self.events.remove(event)
+                    return event
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"Timed out waiting for {method}")
+            self.socket.sock.settimeout(remaining)
+            try:
+                message = json.loads(self.socket.recv())
+            except socket.timeout:
+                raise TimeoutException(f"Timed out waiting for {method}")
+            if "method" in message:
+                self.events.append(message)
+
+    def _check_exception(self, result):
+        details = result.get("exceptionDetails")
+        if not details:
+            return
+        description = details.get("exception", {}).get("description") or details.get("text", "")
+        if STALE_MARKER in description:
+            raise StaleElementReferenceException("Element is no longer attached to the page")
+        if "bedrock-cli:script-timeout" in description:
+            raise TimeoutException("Script did not call back within the script timeout")
+        raise JavascriptException(description)
+
+    def _evaluate(self, expression, await_promise=False, return_by_value=True, timeout=CDP_COMMAND_TIMEOUT):
+        result = self.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": return_by_value,
+            "awaitPromise": await_promise,
+        }, timeout)
+        self._check_exception(result)
+        return result["result"]
+
+    def _call_function(self, object_id, declaration, arguments=(), await_promise=False, return_by_value=True,
+                       timeout=CDP_COMMAND_TIMEOUT):
+        result = self.execute_cdp_cmd("Runtime.callFunctionOn", {
+            "objectId": object_id,
+            "functionDeclaration": declaration,
+            "arguments": [self._to_call_argument(a) for a in arguments],
+            "returnByValue": return_by_value,
+            "awaitPromise": await_promise,
+        }, timeout)
+        self._check_exception(result)
+        return result["result"]
+
+    def _to_call_argument(self, value):
+        if isinstance(value, CdpElement):
+            return {"objectId": value.object_id}
+        return {"value": value}
+
+    def _elements_from_array(self, remote_array):
+        if remote_array.get("subtype") != "array":
+            return []
+        properties = self.execute_cdp_cmd("Runtime.getProperties", {
+            "objectId": remote_array["objectId"],
+            "ownProperties": True,
+        })["result"]
+        indexed = [(int(p["name"]), p["value"]["objectId"]) for p in properties
+                   if p["name"].isdigit() and "objectId" in p.get("value", {})]
+        return [CdpElement(self, object_id) for _, object_id in sorted(indexed)]
+
+    def _find(self, root_object_id, by, value, many):
+        if root_object_id is None:
+            expression = f"({FIND_ELEMENTS_JS}).call(document, {json.dumps(by)}, {json.dumps(value)}, {json.dumps(many)})"
+            remote = self._evaluate(expression, return_by_value=False)
+        else:
+            remote = self._call_function(root_object_id, FIND_ELEMENTS_JS, (by, value, many), return_by_value=False)
+        if many:
+            return self._elements_from_array(remote)
+        if remote.get("subtype") != "node":
+            raise NoSuchElementException(f"Unable to locate element: {{\"method\":\"{by}\",\"selector\":\"{value}\"}}")
+        return CdpElement(self, remote["objectId"])
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # the WebDriver slice
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, url):
+        self.events = [e for e in self.events if e["method"] != "Page.loadEventFired"]
+        result = self.execute_cdp_cmd("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise WebDriverException(f"Navigation to {url} failed: {result['errorText']}")
+        # same-document navigations (e.g. only the #fragment changed) don't have a loader and never fire a load event
+        if result.get("loaderId"):
+            self._wait_for_event("Page.loadEventFired", config.get_timeout("page_load"))
+
+    @property
+    def current_url(self):
+        return self._evaluate("location.href")["value"]
+
+    def find_element(self, by="id", value=None):
+        return self._find(None, by, value, many=False)
+
+    def find_elements(self, by="id", value=None):
+        return self._find(None, by, value, many=True)
+
+    def execute_script(self, script, *args):
+        declaration = f"function() {{ {script}\n}}"
+        element_args = [a for a in args if isinstance(a, CdpElement)]
+        if element_args:
+            return self._call_function(element_args[0].object_id, declaration, args).get("value")
+        expression = f"({declaration}).apply(null, {json.dumps(list(args))})"
+        return self._evaluate(expression).get("value")
+
+    # like Selenium, the script gets a callback as its last argument and the call returns whatever that is called with.
+    # The page gives up after the script timeout, and the socket waits that long plus SCRIPT_ANSWER_MARGIN for it to
+    # say so, rather than CDP_COMMAND_TIMEOUT.
+    def execute_async_script(self, script, *args):
+        declaration = ("function() {\n"
+                       "    const args = Array.prototype.slice.call(arguments);\n"
+                       "    return new Promise((resolve, reject) => {\n"
+                       f"        setTimeout(() => reject(new Error('bedrock-cli:script-timeout')), {int(self.script_timeout * 1000)});\n"
+                       "        args.push(resolve);\n"
+                       f"        (function() {{ {script}\n}}).apply(this, args);\n"
+                       "    });\n"
+                       "}")
+        answer_timeout = self.script_timeout + SCRIPT_ANSWER_MARGIN
+        element_args = [a for a in args if isinstance(a, CdpElement)]
+        if element_args:
+            return self._call_function(element_args[0].object_id, declaration, args, await_promise=True,
+                                       timeout=answer_timeout).get("value")
+        expression = f"({declaration}).apply(null, {json.dumps(list(args))})"
+        return self._evaluate(expression, await_promise=True, timeout=answer_timeout).get("value")
+
+    def set_script_timeout(self, time_to_wait):
+        self.script_timeout = time_to_wait
+
+    def save_screenshot(self, filename):
+        try:
+            data = self.execute_cdp_cmd("Page.captureScreenshot", {"format": "png"})["data"]
+            with open(filename, "wb") as f:
+                f.write(base64.b64decode(data))
+            return True
+        except (OSError, WebDriverException):
+            return False
+
+    def quit(self):
+        if getattr(self, "socket", None) is not None:
+            try:
+                self.execute_cdp_cmd("Browser.close", {})
+            except (OSError, WebDriverException):
+                pass
+            self.socket.close()
+            self.socket = None
+        if self.process.poll() is None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CdpElement:
+    def __init__(self, driver, object_id):
+        self.driver = driver
+        self.object_id = object_id
+
+    @property
+    def id(self):
+        return self.object_id
+
+    def _call(self, body, *arguments):
+        declaration = f"function() {{ {STALE_CHECK_JS} {body} }}"
+        return self.driver._call_function(self.object_id, declaration, arguments).get("value")
+
+    @property
+    def text(self):
+        return self._call("return this.innerText || '';")
+
+    # the attribute if there is one, otherwise the property of the same name, like Selenium
+    def get_attribute(self, name):
+        return self._call("const a = this.getAttribute(arguments[0]); if (a !== null) return a; "
+                          "const p = this[arguments[0]]; "
+                          "return (p === undefined || p === null || typeof p === 'object' || typeof p === 'function') "
+                          "? null : String(p);", name)
+
+    def is_displayed(self):
+        return self._call("const r = this.getBoundingClientRect(); const s = getComputedStyle(this); "
+                          "return r.width > 0 && r.height > 0 && s.visibility !== 'hidden' && s.display !== 'none';")
+
+    def is_enabled(self):
+        return self._call("return !this.disabled;")
+
+    # a real mouse click at the centre of the element, the same as chromedriver does
+    def click(self):
+        x, y = self._call("this.scrollIntoView({block: 'center', inline: 'center'}); "
+                          "const r = this.getBoundingClientRect(); return [r.left + r.width / 2, r.top + r.height / 2];")
+        for event_type in ("mouseMoved", "mousePressed", "mouseReleased"):
+            self.driver.execute_cdp_cmd("Input.dispatchMouseEvent", {
+                "type": event_type, "x": x, "y": y, "button": "left", "clickCount": 1,
+            })
+
+    def clear(self):
+        self._call("this.focus(); "
+                   "const proto = Object.getPrototypeOf(this); "
+                   "const setter = Object.getOwnPropertyDescriptor(proto, 'value'); "
+                   "if (setter && setter.set) setter.set.call(this, ''); else this.value = ''; "
+                   "this.dispatchEvent(new Event('input', {bubbles: true})); "
+                   "this.dispatchEvent(new Event('change', {bubbles: true}));")
+
+    def send_keys(self, *value):
+        self._call("this.focus();")
+        self.driver.execute_cdp_cmd("Input.insertText", {"text": "".join(str(v) for v in value)})
+
+    def find_element(self, by="id", value=None):
+        return self.driver._find(self.object_id, by, value, many=False)
+
+    def find_elements(self, by="id", value=None):
+        return self.driver._find(self.object_id, by, value, many=True)
@@ -0,0 +1,424 @@
+# cache_backends.py
+#
+# Where get_foundation_model_enablement_status() keeps its cached catalog.  Pick one with --cache (or BEDROCK_CLI_CACHE):
+#
+#   dir:./cache                  one JSON file per entry in a directory (the default, same place as before).  Files
+#                                are written to a temp name and renamed into place, so it's safe on NFS too.
+#   sqlite:/shared/bedrock.db    a single SQLite file, for sharing between working directories or runners.  Uses the
+#                                rollback journal rather than WAL, since WAL doesn't work over network filesystems.
+#   http://host:port/prefix      a key-value service: GET/PUT/DELETE <url>/<key>.  "python cache_backends.py stand-in"
+#                                starts a local in-memory stand-in for testing.
+#
+# Keys are namespaced "<account>/<region>/<name>" by the caller, so runners for the same account and region share
+# entries.  Every backend also has a lease, so when a fleet of runners all find the cache stale at the same time only
+# one of them scrapes the console and the rest wait for its result.  Taking over an expired lease is a single atomic
+# step in every backend, so two runners can't both break the same lease, and release_lease() only ever removes the
+# caller's own lease.
+#
+# A backend that can't be reached or written (an unreachable server, a missing or read-only directory, a locked or
+# corrupt SQLite file) raises CacheUnavailableError from the constructor, put(), delete(), purge() and
+# acquire_lease(); get() just misses, and release_lease() gives up quietly.
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_CACHE = "dir:./cache"
+HTTP_TIMEOUT = 10
+
+
+class CacheUnavailableError(RuntimeError):
+    pass
+
+
+def safe_key_part(part):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", str(part)) or "_"
+
+
+# splits a --cache spec into (backend, location), or raises ValueError if it isn't one we know
+def parse_cache_spec(spec):
+    if spec.startswith("dir:") and spec[len("dir:"):]:
+        return "dir", spec[len("dir:"):]
+    if spec.startswith("sqlite:") and spec[len("sqlite:"):]:
+        return "sqlite", spec[len("sqlite:"):]
+    if spec.startswith("http://") or spec.startswith("https://"):
+        return "http", spec
+    raise ValueError(f"Unknown cache backend '{spec}'.  Use dir:<path>, sqlite:<path> or http(s)://<url>")
+
+
+def get_cache_backend(spec=None):
+    if spec is None:
+        spec = os.environ.get("BEDROCK_CLI_CACHE", DEFAULT_CACHE)
+    backend, location = parse_cache_spec(spec)
+    if backend == "dir":
+        return LocalDirectoryCache(location)
+    if backend == "sqlite":
+        return SqliteCache(location)
+    return HttpKeyValueCache(location)
+
+
+class LocalDirectoryCache:
+    def __init__(self, path):
+        self.root = Path(path)
+        self.held_leases = {}
+
+    def _path(self, key, suffix=".json"):
+        parts = [safe_key_part(p) for p in key.split("/")]
+        return self.root.joinpath(*parts[:-1]) / (parts[-1] + suffix)
+
+    def get(self, key, max_age):
+        path = self._path(key)
+        try:
+            if (time.time() - path.stat().st_mtime) >= max_age:
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        except OSError as e:
+            raise CacheUnavailableError(f"Unable to store {key} in {self.root}: {e}")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            os.unlink(tmp_path)
+            raise CacheUnavailableError(f"Unable to store {key} in {self.root}: {e}")
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise CacheUnavailableError(f"Unable to delete {key} from {self.root}: {e}")
+
+    # a file that goes away (or can't be removed) part way through is left for the next purge; only being unable to
+    # look at the directory at all is an error
+    def purge(self, max_age):
+        now = time.time()
+        try:
+            if not self.root.exists():
+                return
+            files = list(self.root.rglob("*"))
+        except OSError as e:
+            raise CacheUnavailableError(f"Unable to purge {self.root}: {e}")
+        for file in files:
+            try:
+                # leases expire on their own schedule, see acquire_lease()
+                if file.is_file() and file.suffix != ".lease" and (now - file.stat().st_mtime) > max_age:
+                    file.unlink()
+            except OSError:
+                pass
+
+    # every lease on a key is its own file, "<name>.<generation>.lease", whose mtime is when it expires, and the highest
+    # generation is the current lease.  A lease file is prepared under a temp name and hard linked into place, which
+    # fails if the name exists (atomic on local disks and over NFS), and is only deleted by its owner or once
+    # superseded.  So taking over an expired lease is just creating the next generation: of two runners that both find
+    # generation n expired, only one can create n + 1.
+    def _generations(self, key):
+        base = self._path(key, "")
+        generations = {}
+        for file in base.parent.glob(base.name + ".*.lease"):
+            number = file.name[len(base.name) + 1:-len(".lease")]
+            if number.isdigit():
+                generations[int(number)] = file
+        return generations
+
+    def acquire_lease(self, key, ttl):
+        try:
+            return self._take_next_generation(key, ttl)
+        except OSError as e:
+            raise CacheUnavailableError(f"Unable to take the scrape lease in {self.root}: {e}")
+
+    def _take_next_generation(self, key, ttl):
+        self._path(key).parent.mkdir(parents=True, exist_ok=True)
+        generations = self._generations(key)
+        current = max(generations, default=0)
+        if current:
+            try:
+                if generations[current].stat().st_mtime > time.time():
+                    return False
+            except FileNotFoundError:
+                pass  # released since we looked
+        path = self._path(key, f".{current + 1}.lease")
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-lease-")
+        os.close(fd)
+        try:
+            expires_at = time.time() + ttl
+            os.utime(tmp_path, (expires_at, expires_at))
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+
+        # someone who looked before us may have gone on to a later generation; theirs wins
+        newer = [file for number, file in self._generations(key).items() if number > current + 1]
+        if newer:
+            path.unlink()
+            return False
+        self.held_leases[key] = path
+        for number, file in generations.items():
+            try:
+                file.unlink()
+            except OSError:
+                pass
+        return True
+
+    def release_lease(self, key):
+        path = self.held_leases.pop(key, None)
+        if path is None:
+            return
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class SqliteCache:
+    def __init__(self, path):
+        self.path = path
+        with self._transaction("open") as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stored_at REAL, data TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL, owner TEXT)")
+            if "owner" not in [row[1] for row in db.execute("PRAGMA table_info(leases)")]:
+                db.execute("ALTER TABLE leases ADD COLUMN owner TEXT")
+        self.owner = uuid.uuid4().hex
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=DELETE")
+        return db
+
+    # one connection and transaction, with SQLite's errors (a missing directory, a read-only or corrupt file, a lock
+    # held for longer than the busy timeout) turned into CacheUnavailableError
+    @contextmanager
+    def _transaction(self, action):
+        try:
+            with closing(self._connect()) as db, db:
+                yield db
+        except (sqlite3.Error, OSError) as e:
+            raise CacheUnavailableError(f"Unable to {action} the cache at {self.path}: {e}")
+
+    def get(self, key, max_age):
+        try:
+            with self._transaction("read") as db:
+                row = db.execute("SELECT data FROM entries WHERE key = ? AND stored_at > ?",
+                                 (key, time.time() - max_age)).fetchone()
+            return json.loads(row[0]) if row else None
+        except (CacheUnavailableError, ValueError):
+            return None
+
+    def put(self, key, data):
+        with self._transaction("write") as db:
+            db.execute("INSERT OR REPLACE INTO entries (key, stored_at, data) VALUES (?, ?, ?)",
+                       (key, time.time(), json.dumps(data)))
+
+    def delete(self, key):
+        with self._transaction("delete from") as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def purge(self, max_age):
+        with self._transaction("purge") as db:
+            db.execute("DELETE FROM entries WHERE stored_at <= ?", (time.time() - max_age,))
+            db.execute("DELETE FROM leases WHERE expires_at <= ?", (time.time(),))
+
+    # the expiry check and the insert happen in one transaction, under SQLite's write lock
+    def acquire_lease(self, key, ttl):
+        now = time.time()
+        with self._transaction("take the scrape lease in") as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = db.execute("INSERT OR IGNORE INTO leases (key, expires_at, owner) VALUES (?, ?, ?)",
+                                (key, now + ttl, self.owner))
+            return cursor.rowcount == 1
+
+    # an unreleased lease just expires
+    def release_lease(self, key):
+        try:
+            with self._transaction("release the scrape lease in") as db:
+                db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+        except CacheUnavailableError:
+            pass
+
+
+# Entries are stored as {"stored_at": <unix time>, "data": ...}.  Leases use conditional PUTs, so the server must
+# support If-None-Match: * (refuse with 412 if the key exists) and If-Match: <ETag> (refuse with 412 unless the key's
+# current ETag matches), and send an ETag with GET and PUT responses.  An expired lease is taken over with a PUT that's
+# conditional on the ETag of the expired lease, so only one runner's takeover can succeed.
+# requests is imported where it's used, so the dir and sqlite backends don't pay for importing it.
+class HttpKeyValueCache:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.held_leases = {}
+
+    def _url(self, key):
+        return self.url + "/" + "/".join(safe_key_part(p) for p in key.split("/"))
+
+    def get(self, key, max_age):
+        import requests
+
+        try:
+            response = requests.get(self._url(key), timeout=HTTP_TIMEOUT)
+            if response.status_code != 200:
+                return None
+            entry = response.json()
+        except (requests.RequestException, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) >= max_age:
+            return None
+        return entry.get("data")
+
+    def put(self, key, data):
+        import requests
+
+        try:
+            response = requests.put(self._url(key), json={"stored_at": time.time(), "data": data},
+                                    timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise CacheUnavailableError(f"Unable to store {key} in {self.url}: {e}")
+
+    def delete(self, key):
+        import requests
+
+        try:
+            requests.delete(self._url(key), timeout=HTTP_TIMEOUT).raise_for_status()
+        except requests.RequestException as e:
+            raise CacheUnavailableError(f"Unable to delete {key} from {self.url}: {e}")
+
+    # expiry is up to the server; stale entries are ignored by get() anyway
+    def purge(self, max_age):
+        pass
+
+    def acquire_lease(self, key, ttl):
+        import requests
+
+        lease_url = self._url(key) + ".lease"
+        try:
+            for _ in range(2):
+                lease = {"expires_at": time.time() + ttl}
+                response = requests.put(lease_url, json=lease, headers={"If-None-Match": "*"}, timeout=HTTP_TIMEOUT)
+                if response.status_code != 412:
+                    response.raise_for_status()
+                    self.held_leases[key] = response.headers.get("ETag")
+                    return True
+
+                current = requests.get(lease_url, timeout=HTTP_TIMEOUT)
+                if current.status_code == 404:
+                    continue  # released since our PUT; try again
+                current.raise_for_status()
+                etag = current.headers.get("ETag")
+                if current.json().get("expires_at", 0) > time.time() or not etag:
+                    return False
+                response = requests.put(lease_url, json=lease, headers={"If-Match": etag}, timeout=HTTP_TIMEOUT)
+                if response.status_code == 412:
+                    return False  # someone else took it over first
+                response.raise_for_status()
+                self.held_leases[key] = response.headers.get("ETag")
+                return True
+        except (requests.RequestException, ValueError) as e:
+            raise CacheUnavailableError(f"Unable to take the scrape lease from {self.url}: {e}")
+        return False
+
+    def release_lease(self, key):
+        import requests
+
+        if key not in self.held_leases:
+            return
+        etag = self.held_leases.pop(key)
+        try:
+            requests.delete(self._url(key) + ".lease", headers={"If-Match": etag} if etag else {},
+                            timeout=HTTP_TIMEOUT)
+        except requests.RequestException:
+            pass
+
+
+class StandInKeyValueHandler(BaseHTTPRequestHandler):
+    store = {}
+    lock = threading.Lock()
+
+    def _reply(self, status, body=b"", etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _etag(body):
+        return '"' + sha1(body).hexdigest() + '"'
+
+    # 412 unless the request's If-None-Match / If-Match conditions hold for the current value
+    def _preconditions_hold(self):
+        current = self.store.get(self.path)
+        if self.headers.get("If-None-Match") == "*" and current is not None:
+            return False
+        if_match = self.headers.get("If-Match")
+        if if_match is not None and (current is None or self._etag(current) != if_match):
+            return False
+        return True
+
+    def do_GET(self):
+        with self.lock:
+            body = self.store.get(self.path)
+        if body is None:
+            self._reply(404)
+        else:
+            self._reply(200, body, self._etag(body))
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            if not self._preconditions_hold():
+                self._reply(412)
+                return
+            self.store[self.path] = body
+        self._reply(204, etag=self._etag(body))
+
+    def do_DELETE(self):
+        with self.lock:
+            if not self._preconditions_hold():
+                self._reply(412)
+                return
+            self.store.pop(self.path, None)
+        self._reply(204)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stand_in(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), StandInKeyValueHandler)
+    print(f"Stand-in key-value cache: http://{host}:{server.server_address[1]}/bedrock-cli")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "stand-in":
+        serve_stand_in(int(sys.argv[2]) if len(sys.argv) > 2 else 8766)
+    else:
+        print("usage: python cache_backends.py stand-in [port]")
+        sys.exit(1)
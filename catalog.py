@@ -0,0 +1,158 @@
+# catalog.py
+#
+# An in-memory index over the "aws bedrock list-foundation-models" output, keyed by modelId, with secondary indexes by
+# model name, provider and access status.  Every lookup the commands do goes through here, so none of them scan the
+# model list.
+#
+# It also does the join between the console's model access table and the catalog.  The console shows rows by display
+# name, but the catalog has several entries that can share a name: context-length variants ("...-v1:0:28k",
+# "...-v1:0:200k") and on-demand vs provisioned versions of the same base model, and sometimes different versions with
+# the same display name, which the console may show as one row or several.  Each console row is resolved to the base
+# model IDs it stands for, and every variant of those base models gets the row's status.  Rows that can't be told apart
+# leave their candidates Unknown.
+
+import re
+
+UNKNOWN_STATUS = "Unknown"
+
+
+class AmbiguousModelError(ValueError):
+    def __init__(self, name_or_id, what, candidates):
+        self.candidates = candidates
+        super().__init__(f"{name_or_id} matches models with different {what}: "
+                         f"{', '.join(f'{model_id} ({value})' for model_id, value in candidates.items())}.  "
+                         f"Pass one of these model IDs instead")
+
+
+# the model ID of the base model an entry is a variant of.  A context-length suffix is dropped, and so is a ":0"
+# version, since "anthropic.claude-v2" and "anthropic.claude-v2:0:18k" are the same model:
+#   "anthropic.claude-3-sonnet-20240229-v1:0:28k" -> "anthropic.claude-3-sonnet-20240229-v1"
+#   "anthropic.claude-v2:1:200k" -> "anthropic.claude-v2:1"
+def base_model_id(model_id):
+    parts = model_id.split(":")
+    if len(parts) < 2 or parts[1] == "0":
+        return parts[0]
+    return ":".join(parts[:2])
+
+
+# whether model_id appears in text as a whole ID, not as the start of a longer one
+def mentions(text, model_id):
+    return re.search(re.escape(model_id) + r"(?![\w.:-])", text) is not None
+
+
+class CatalogIndex:
+    def __init__(self, model_data):
+        self.model_data = model_data
+        self.by_id = {}
+        self.by_lower_id = {}
+        self.by_name = {}
+        self.by_provider = {}
+        self.by_base_id = {}
+        for model in model_data.get("modelSummaries", []):
+            model_id = model.get("modelId", "")
+            self.by_id[model_id] = model
+            self.by_lower_id[model_id.lower()] = model
+            self.by_name.setdefault(model.get("modelName", "").lower(), []).append(model)
+            self.by_provider.setdefault(model.get("providerName", "").lower(), []).append(model)
+            self.by_base_id.setdefault(base_model_id(model_id), []).append(model)
+        self._index_statuses()
+
+    def _index_statuses(self):
+        self.by_status = {}
+        for model in self.by_id.values():
+            self.by_status.setdefault(model.get("accessStatus", UNKNOWN_STATUS).lower(), []).append(model)
+
+    def get(self, model_id):
+        return self.by_id.get(model_id)
+
+    # every catalog entry matching a model ID or a model name, case-insensitively.  An ID match wins over a name match.
+    def find(self, name_or_id):
+        key = name_or_id.lower()
+        if key in self.by_lower_id:
+            return [self.by_lower_id[key]]
+        return list(self.by_name.get(key, []))
+
+    # the one value of field shared by every match, or default if nothing matches.  A name whose matches disagree
+    # raises AmbiguousModelError listing them, rather than picking one.
+    def _agreed(self, name_or_id, field, default, what):
+        matches = self.find(name_or_id)
+        values = {model["modelId"]: model.get(field, default) for model in matches}
+        if len(set(values.values())) > 1:
+            raise AmbiguousModelError(name_or_id, what, values)
+        return next(iter(values.values()), default)
+
+    def status_of(self, name_or_id):
+        return self._agreed(name_or_id, "accessStatus", UNKNOWN_STATUS, "access statuses")
+
+    def provider_of(self, name_or_id):
+        return self._agreed(name_or_id, "providerName", None, "providers")
+
+    def with_provider(self, provider_name):
+        return list(self.by_provider.get(provider_name.lower(), []))
+
+    def with_status(self, status):
+        return list(self.by_status.get(status.lower(), []))
+
+    # distinct base model IDs among the entries with this display name, in catalog order
+    def base_ids_for_name(self, model_name):
+        base_ids = []
+        for model in self.by_name.get(model_name.lower(), []):
+            base_id = base_model_id(model["modelId"])
+            if base_id not in base_ids:
+                base_ids.append(base_id)
+        return base_ids
+
+    # whether the row's text names this base model, by its base ID or any of its variants' IDs
+    def _row_mentions(self, text, base_id):
+        model_ids = [base_id] + [model["modelId"] for model in self.by_base_id[base_id]]
+        return any(mentions(text, model_id) for model_id in model_ids)
+
+    # Resolves the console rows (dicts with "name", "status" and the row's full "text") to base model IDs.  A row is
+    # matched by:
+    #   1. a model ID that appears in the row's text, if it points at exactly one base model
+    #   2. otherwise, if the row is the only one with its name, every base model with that name (the console shows
+    #      one row for a name that covers several versions, e.g. "Claude" for claude-v2 and claude-v2:1)
+    #   3. otherwise, if there's one row and one base model left for the name, each other
+    # Anything else would be a guess (the console's row order has nothing to do with the catalog's), so those base
+    # models are reported as ambiguous rather than given some row's status.
+    # Returns ({base model ID: status}, {ambiguous base model IDs}).
+    def resolve_rows(self, rows):
+        rows_by_name = {}
+        for row in rows:
+            rows_by_name.setdefault(row["name"].lower(), []).append(row)
+
+        statuses = {}
+        ambiguous = set()
+        for name, name_rows in rows_by_name.items():
+            base_ids = self.base_ids_for_name(name)
+            unresolved_rows = []
+            for row in name_rows:
+                mentioned = [base_id for base_id in base_ids if self._row_mentions(row.get("text", ""), base_id)]
+                if len(mentioned) == 1:
+                    statuses[mentioned[0]] = row["status"]
+                else:
+                    unresolved_rows.append(row)
+
+            remaining_ids = [base_id for base_id in base_ids if base_id not in statuses]
+            if not unresolved_rows or not remaining_ids:
+                continue
+            if len(name_rows) == 1 or (len(remaining_ids) == 1 and len(unresolved_rows) == 1):
+                for base_id in remaining_ids:
+                    statuses[base_id] = unresolved_rows[0]["status"]
+            else:
+                ambiguous.update(remaining_ids)
+        return statuses, ambiguous
+
+    # sets accessStatus on every catalog entry from the console rows, and refreshes the status index.  Entries whose
+    # console row couldn't be told apart from another version's get UNKNOWN_STATUS and an accessStatusNote saying so.
+    def apply_access_status(self, rows):
+        statuses, ambiguous = self.resolve_rows(rows)
+        for base_id, models in self.by_base_id.items():
+            for model in models:
+                model["accessStatus"] = statuses.get(base_id, UNKNOWN_STATUS)
+                if base_id in ambiguous:
+                    model["accessStatusNote"] = "ambiguous: the console row for this name doesn't identify the version"
+                else:
+                    model.pop("accessStatusNote", None)
+        self._index_statuses()
+        return self.model_data
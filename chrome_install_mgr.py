@@ -5,22 +5,77 @@ import platform
 import time
 import zipfile
 import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.support.wait import WebDriverWait
 import config
+import metrics
+import page_helpers
 
 CHROMEDRIVER_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
 
 
+# WebDriverWait(driver, timeout).until(condition), where the timeout comes from the step's entry in the config timing
+# profile.  The time the wait actually took (or its whole budget, if it timed out) is recorded for that step.  Pass
+# record_timeout=False for waits that are expected to time out some of the time, so they don't inflate the budget.
+def wait_until(driver, step, condition, record_timeout=True):
+    budget = config.get_timeout(step)
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, budget, poll_frequency=0.1).until(condition)
+    except TimeoutException:
+        if record_timeout:
+            config.record_latency(step, budget)
+        raise
+    config.record_latency(step, time.monotonic() - start)
+    return result
+
+
+# waits for the page to finish loading and then for the network to go quiet (no new resource requests for
+# config.SETTLE_QUIET_PERIOD seconds), instead of sleeping a fixed amount of time and hoping.  The waiting happens in
+# the page (the waitForSettle page helper), so it's one round trip rather than a poll every 100ms.  If the document
+# navigates away while the helper is waiting, the script dies with it, and this falls back to polling from here.
 def wait_for_browser_settle(driver):
     if config.is_verbose_mode():
         print("Waiting for DOM to settle...")
-    time.sleep(3)
-    WebDriverWait(driver, 30).until(
-        lambda d: d.execute_script("return document.readyState") == "complete"
-    )
+    budget = config.get_timeout("settle")
+    start = time.monotonic()
+    try:
+        result = page_helpers.call(driver, "waitForSettle", int(config.SETTLE_QUIET_PERIOD * 1000),
+                                   int(budget * 1000), script_timeout=budget + 5)
+    except WebDriverException:
+        result = None
+    if result is not None:
+        if not result.get("ok"):
+            config.record_latency("settle", budget)
+            raise TimeoutException(result.get("error"))
+        config.record_latency("settle", time.monotonic() - start)
+        return
+
+    last_seen = {"count": -1, "since": time.monotonic()}
+
+    def settled(d):
+        ready, resource_count = d.execute_script(page_helpers.SETTLE_STATE_JS)
+        now = time.monotonic()
+        if ready != "complete" or resource_count != last_seen["count"]:
+            last_seen["count"] = resource_count
+            last_seen["since"] = now
+            return False
+        return now - last_seen["since"] >= config.SETTLE_QUIET_PERIOD
+
+    wait_until(driver, "settle", settled)
 
 
 def download_chromedriver(version: object) -> object:
+    try:
+        with metrics.timed("bedrock_cli_chromedriver_download_duration_seconds"):
+            fetch_and_extract_chromedriver(version)
+    except Exception:
+        metrics.inc("bedrock_cli_chromedriver_downloads_total", {"result": "failure"})
+        raise
+    metrics.inc("bedrock_cli_chromedriver_downloads_total", {"result": "success"})
+
+
+def fetch_and_extract_chromedriver(version):
     major_version = version.split(".")[0]
     if config.is_verbose_mode():
         print(f"Detected Chrome major version: {major_version}")
@@ -144,6 +199,32 @@ def get_chrome_version():
         raise RuntimeError(f"Error fetching Chrome version: {e}")
 
 
+# where the Chrome executable lives, for launching Chrome directly (the cdp browser backend).  BEDROCK_CLI_CHROME_BINARY
+# wins if it's set.
+def find_chrome_binary():
+    configured = os.environ.get("BEDROCK_CLI_CHROME_BINARY")
+    if configured:
+        return configured
+
+    if platform.system() == "Windows":
+        candidates = [
+            os.path.join(os.environ.get("PROGRAMFILES", r"C:\Program Files"), r"Google\Chrome\Application\chrome.exe"),
+            os.path.join(os.environ.get("PROGRAMFILES(X86)", r"C:\Program Files (x86)"),
+                         r"Google\Chrome\Application\chrome.exe"),
+            os.path.join(os.environ.get("LOCALAPPDATA", ""), r"Google\Chrome\Application\chrome.exe"),
+        ]
+    elif platform.system() == "Darwin":
+        candidates = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+    else:
+        candidates = [shutil.which(name) for name in
+                      ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")]
+
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    raise RuntimeError("Unable to find a Chrome executable.  Set BEDROCK_CLI_CHROME_BINARY to its path.")
+
+
 def ensure_chromedriver_installed():
     chromedriver_path = shutil.which("chromedriver")
     if chromedriver_path:
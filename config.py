@@ -1,4 +1,8 @@
 # config.py
+import json
+import math
+import os
+from pathlib import Path
 
 # Default to False, can be set dynamically
 VERBOSE_MODE = False
@@ -11,3 +15,184 @@ def set_verbose_mode(value: bool):
 
 def is_verbose_mode():
     return VERBOSE_MODE
+
+
+# How login_to_console() signs in: "form" drives the console sign-in page, "federation" builds a federation sign-in URL
+# from temporary credentials (falling back to the form if that fails)
+LOGIN_METHODS = ["form", "federation"]
+LOGIN_METHOD = "form"
+
+
+def set_login_method(value: str):
+    global LOGIN_METHOD
+    LOGIN_METHOD = value
+
+
+def get_login_method():
+    return LOGIN_METHOD
+
+
+# Which browser backend browser.launch_browser() uses: "selenium" goes through chromedriver, "cdp" talks to Chrome's
+# DevTools websocket directly (see browser.py)
+BROWSER_BACKENDS = ["selenium", "cdp"]
+BROWSER_BACKEND = "selenium"
+
+
+def set_browser_backend(value: str):
+    global BROWSER_BACKEND
+    BROWSER_BACKEND = value
+
+
+def get_browser_backend():
+    return BROWSER_BACKEND
+
+
+# Where the enablement status cache lives, as a cache_backends spec (dir:<path>, sqlite:<path> or http(s)://<url>).
+# None means BEDROCK_CLI_CACHE, or ./cache if that isn't set either.
+CACHE_SPEC = None
+
+
+def set_cache_spec(value):
+    global CACHE_SPEC
+    CACHE_SPEC = value
+
+
+def get_cache_spec():
+    return CACHE_SPEC
+
+
+# Which section of the credentials file / keyring entry credentials.py reads.  None means BEDROCK_CLI_PROFILE, or
+# "default".
+CREDENTIALS_PROFILE = None
+
+
+def set_credentials_profile(value):
+    global CREDENTIALS_PROFILE
+    CREDENTIALS_PROFILE = value
+
+
+def get_credentials_profile():
+    return CREDENTIALS_PROFILE
+
+
+# The AWS account ID given with --account, if any.  It's used for the console login and to namespace the shared cache
+# and the job journal.
+ACCOUNT_ID = None
+
+
+def set_account_id(value):
+    global ACCOUNT_ID
+    ACCOUNT_ID = value
+
+
+def get_account_id():
+    return ACCOUNT_ID
+
+
+# Where login_to_console() gets MFA codes from (see mfa.py).  "auto" uses BEDROCK_CLI_MFA_COMMAND if it's set, a TOTP
+# seed from the credentials chain if there is one, and otherwise asks on the terminal.
+MFA_METHODS = ["auto", "totp", "command", "prompt"]
+MFA_METHOD = "auto"
+
+
+def set_mfa_method(value):
+    global MFA_METHOD
+    MFA_METHOD = value
+
+
+def get_mfa_method():
+    return MFA_METHOD
+
+
+# Timing profile.  Every wait in the browser code names a step, and the step's timeout comes from get_timeout(), so
+# they're all in one place.  Each successful wait records how long it actually took, and the history is kept in
+# TIMING_HISTORY_FILE between runs.  Once a step has MIN_TIMING_SAMPLES observations its timeout becomes the 95th
+# percentile times TIMING_HEADROOM, clamped between MIN_TIMEOUT and the default times MAX_TIMEOUT_FACTOR.  A wait that
+# times out is recorded as taking its whole budget, so a step that slows down grows its budget again on later runs.
+#
+# Overrides win over everything: --timeout step=seconds on the command line, or BEDROCK_CLI_TIMEOUT_<STEP> (upper
+# case) in the environment.
+DEFAULT_TIMEOUTS = {
+    "login_element": 30,  # sign in link and the account / user / password / MFA fields
+    "login_redirect": 5,  # leaving the sign in page after submitting the form
+    "model_table": 20,  # model access table and its filter box
+    "wizard_button": 30,  # Enable specific / Modify / Next buttons
+    "wizard_step": 10,  # Submit button, and each page transition of the enablement wizard
+    "page_load": 30,  # document.readyState == complete
+    "settle": 30,  # page load plus network quiet, in wait_for_browser_settle()
+    "mfa_verify": 30,  # leaving the MFA page after submitting a code; still being there afterwards means it was rejected
+}
+# steps whose timeout is never learned.  A timeout on these is treated as a failure of what was waited for, not as a
+# slow page, so a budget learned from fast runs would turn a slow-but-fine run into a false failure.
+FIXED_TIMEOUT_STEPS = {"mfa_verify"}
+SETTLE_QUIET_PERIOD = 0.5  # seconds without new network requests before a page counts as settled
+MIN_TIMING_SAMPLES = 5
+MAX_TIMING_SAMPLES = 50
+TIMING_PERCENTILE = 0.95
+TIMING_HEADROOM = 2.0
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT_FACTOR = 4
+TIMING_HISTORY_FILE = Path(os.environ.get("BEDROCK_CLI_TIMING_HISTORY", "./timings.json"))
+
+TIMEOUT_OVERRIDES = {}
+_timing_history = None
+_timing_history_dirty = False
+
+
+def set_timeout_override(step: str, seconds: float):
+    if step not in DEFAULT_TIMEOUTS:
+        raise ValueError(f"Unknown timing step '{step}'.  Known steps: {', '.join(DEFAULT_TIMEOUTS)}")
+    TIMEOUT_OVERRIDES[step] = float(seconds)
+
+
+def load_timing_history():
+    global _timing_history
+    if _timing_history is None:
+        try:
+            with open(TIMING_HISTORY_FILE, "r") as f:
+                _timing_history = json.load(f)
+        except (OSError, ValueError):
+            _timing_history = {}
+    return _timing_history
+
+
+def save_timing_history():
+    global _timing_history_dirty
+    if not _timing_history_dirty:
+        return
+    tmp_file = TIMING_HISTORY_FILE.with_name(TIMING_HISTORY_FILE.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(load_timing_history(), f)
+    os.replace(tmp_file, TIMING_HISTORY_FILE)
+    _timing_history_dirty = False
+
+
+def record_latency(step: str, seconds: float):
+    global _timing_history_dirty
+    samples = load_timing_history().setdefault(step, [])
+    samples.append(round(seconds, 3))
+    del samples[:-MAX_TIMING_SAMPLES]
+    _timing_history_dirty = True
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def get_timeout(step: str):
+    env_override = os.environ.get(f"BEDROCK_CLI_TIMEOUT_{step.upper()}")
+    if step in TIMEOUT_OVERRIDES:
+        return TIMEOUT_OVERRIDES[step]
+    if env_override:
+        return float(env_override)
+
+    default = DEFAULT_TIMEOUTS[step]
+    if step in FIXED_TIMEOUT_STEPS:
+        return default
+    samples = load_timing_history().get(step, [])
+    if len(samples) < MIN_TIMING_SAMPLES:
+        return default
+    learned = percentile(samples, TIMING_PERCENTILE) * TIMING_HEADROOM
+    return min(max(learned, MIN_TIMEOUT), default * MAX_TIMEOUT_FACTOR)
@@ -0,0 +1,205 @@
+# credentials.py
+#
+# Console sign-in credentials (account ID, IAM user, password), resolved lazily: nothing is looked up until
+# login_to_console() actually needs to fill in the sign-in form, so commands answered from the cache never prompt.
+#
+# Each field comes from the first provider in this chain that has it, so they can be mixed (e.g. the account ID from
+# the environment and the password from the OS keyring):
+#
+#   argument  --account, for the account ID only
+#   env       AWS_ACCOUNT_ID, IAM_ADMIN_USER, IAM_ADMIN_PWD
+#   file      ~/.bedrock_cli/credentials (or BEDROCK_CLI_CREDENTIALS_FILE), an INI file with one section per profile
+#             holding account_id, user and password.  Should only be readable by you.
+#   keyring   the OS keyring (if the optional "keyring" package is installed): service "bedrock-cli", username = the
+#             profile name, password = a JSON object with the same keys as the file
+#   process   the command in BEDROCK_CLI_CREDENTIAL_PROCESS, which must print a JSON object with AccountId, User and
+#             Password, like the AWS CLI's credential_process
+#   prompt    asks on the terminal, but only when there is one; a non-interactive run fails instead of hanging
+#
+# The profile is "default" unless --credentials-profile or BEDROCK_CLI_PROFILE says otherwise.
+#
+# The same chain can also hold an optional TOTP seed for MFA (mfa_seed in the file / keyring, BEDROCK_CLI_MFA_SEED,
+# MfaSeed from the process).  It's never prompted for; see mfa.py.
+
+import configparser
+import getpass
+import json
+import os
+import shlex
+import stat
+import subprocess
+import sys
+from pathlib import Path
+
+import config
+
+FIELDS = ["account_id", "user", "password"]
+PROCESS_KEYS = {"account_id": "AccountId", "user": "User", "password": "Password", "mfa_seed": "MfaSeed"}
+ENV_KEYS = {"account_id": "AWS_ACCOUNT_ID", "user": "IAM_ADMIN_USER", "password": "IAM_ADMIN_PWD",
+            "mfa_seed": "BEDROCK_CLI_MFA_SEED"}
+KEYRING_SERVICE = "bedrock-cli"
+DEFAULT_CREDENTIALS_FILE = Path.home() / ".bedrock_cli" / "credentials"
+
+_resolved = {}
+_searched = set()
+
+
+class CredentialsUnavailableError(RuntimeError):
+    pass
+
+
+def get_profile():
+    return config.get_credentials_profile() or os.environ.get("BEDROCK_CLI_PROFILE", "default")
+
+
+def from_arguments(fields):
+    if "account_id" in fields and config.get_account_id():
+        return {"account_id": config.get_account_id()}
+    return {}
+
+
+def from_environment(fields):
+    return {field: os.environ[ENV_KEYS[field]] for field in fields
+            if field in ENV_KEYS and os.environ.get(ENV_KEYS[field])}
+
+
+def from_file(fields):
+    path = Path(os.environ.get("BEDROCK_CLI_CREDENTIALS_FILE", DEFAULT_CREDENTIALS_FILE))
+    if not path.exists():
+        return {}
+    if os.name == "posix" and path.stat().st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        print(f"Warning: {path} is readable by other users; chmod 600 it", file=sys.stderr)
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(path)
+    if not parser.has_section(get_profile()):
+        return {}
+    section = parser[get_profile()]
+    return {field: section[field] for field in fields if section.get(field)}
+
+
+def from_keyring(fields):
+    try:
+        import keyring
+    except ImportError:
+        return {}
+    try:
+        stored = keyring.get_password(KEYRING_SERVICE, get_profile())
+    except Exception:
+        return {}
+    if not stored:
+        return {}
+    try:
+        values = json.loads(stored)
+    except ValueError:
+        raise CredentialsUnavailableError(f"Keyring entry {KEYRING_SERVICE}/{get_profile()} isn't a JSON object")
+    return {field: values[field] for field in fields if values.get(field)}
+
+
+def from_process(fields):
+    command = os.environ.get("BEDROCK_CLI_CREDENTIAL_PROCESS")
+    if not command:
+        return {}
+    result = subprocess.run(shlex.split(command), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise CredentialsUnavailableError(f"Credential process failed: {result.stderr.strip()}")
+    try:
+        values = json.loads(result.stdout)
+    except ValueError:
+        raise CredentialsUnavailableError("Credential process didn't print a JSON object")
+    return {field: values[PROCESS_KEYS[field]] for field in fields
+            if field in PROCESS_KEYS and values.get(PROCESS_KEYS[field])}
+
+
+PROMPTS = {
+    "account_id": "Type the account number you are using: ",
+    "user": "Type the admin user id you are using: ",
+}
+
+
+def from_prompt(fields):
+    if not sys.stdin.isatty():
+        return {}
+    values = {}
+    for field in fields:
+        if field == "password":
+            values[field] = getpass.getpass("Type the password for user: " + str(_resolved.get("user", "")) + "/"
+                                            + str(_resolved.get("account_id", "")) + "> ")
+        elif field in PROMPTS:
+            values[field] = input(PROMPTS[field])
+    return values
+
+
+PROVIDERS = [
+    ("argument", from_arguments),
+    ("env", from_environment),
+    ("file", from_file),
+    ("keyring", from_keyring),
+    ("process", from_process),
+]
+
+
+def describe(field, value):
+    if field == "mfa_seed":
+        return "(set)"
+    if field != "password":
+        return value
+    half_len = int((len(value) / 2) + 1)
+    return '*' * half_len + value[-half_len:]
+
+
+def remember(name, found):
+    for field, value in found.items():
+        if config.is_verbose_mode():
+            print(f"Found {field} via {name}: {describe(field, value)}")
+        _resolved[field] = value
+
+
+# Resolves the requested fields through the provider chain, remembering what it found for the rest of the run.  The
+# non-interactive providers are only asked once per field per run.  interactive=False leaves out the prompt, and
+# returns whatever could be found instead of raising.
+def resolve(fields=FIELDS, interactive=True):
+    to_search = [field for field in fields if field not in _resolved and field not in _searched]
+    _searched.update(to_search)
+    for name, provider in PROVIDERS:
+        missing = [field for field in to_search if field not in _resolved]
+        if not missing:
+            break
+        remember(name, provider(missing))
+
+    missing = [field for field in fields if field not in _resolved]
+    if missing and interactive:
+        remember("prompt", from_prompt(missing))
+        missing = [field for field in fields if field not in _resolved]
+        if missing:
+            raise CredentialsUnavailableError(
+                f"No console credentials for {', '.join(missing)}: set {', '.join(ENV_KEYS[f] for f in missing)}, "
+                f"add them to the credentials file or keyring, or set BEDROCK_CLI_CREDENTIAL_PROCESS")
+    return {field: _resolved[field] for field in fields if field in _resolved}
+
+
+def get_credentials():
+    return resolve(FIELDS)
+
+
+# the account ID if it's been given explicitly and can be had cheaply: --account, one already resolved this run, the
+# environment or the credentials file, otherwise None.  Used to namespace the cache and the job journal, so it never
+# runs the credential process, opens the keyring or prompts; a cache hit has to stay instant.
+def known_account_id():
+    if "account_id" in _resolved:
+        return _resolved["account_id"]
+    for provider in (from_arguments, from_environment, from_file):
+        found = provider(["account_id"])
+        if found:
+            return found["account_id"]
+    return None
+
+
+# the TOTP seed if one is stored anywhere in the chain, otherwise None
+def get_mfa_seed():
+    return resolve(["mfa_seed"], interactive=False).get("mfa_seed")
+
+
+# the fields that can't be resolved without a prompt, and whether a prompt is possible.  Used by preflight.
+def unresolvable_fields():
+    found = resolve(FIELDS, interactive=False)
+    return [field for field in FIELDS if field not in found], sys.stdin.isatty()
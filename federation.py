@@ -0,0 +1,168 @@
+# federation.py
+#
+# Builds an AWS console federation sign-in URL out of temporary credentials, so the browser can go straight to the
+# console page we want in a single navigation instead of driving the sign-in form.  See
+# https://docs.aws.amazon.com/IAM/latest/UserGuide/id_roles_providers_enable-console-custom-url.html
+#
+# Credentials are looked for in this order:
+#   1. AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY / AWS_SESSION_TOKEN environment variables
+#   2. aws configure export-credentials (whatever the AWS CLI resolves: SSO, assumed role profiles, etc.)
+# The federation endpoint only accepts temporary credentials, so if all we find are long-term keys we trade them for a
+# federation token with aws sts get-federation-token.
+#
+# BEDROCK_CLI_FEDERATION_ENDPOINT can point at a local stand-in for testing; running "python federation.py stand-in"
+# starts one that hands out a dummy token and redirects straight to the destination.
+
+import json
+import os
+import subprocess
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+import config
+
+FEDERATION_ENDPOINT = "https://signin.aws.amazon.com/federation"
+ISSUER = "bedrock-cli"
+FEDERATION_TOKEN_NAME = "bedrock-cli"
+FEDERATION_POLICY_ARN = "arn:aws:iam::aws:policy/AmazonBedrockFullAccess"
+
+# what get_caller_account_id() found, so the AWS CLI is only asked once a run
+_caller_account_id = {}
+
+
+def get_federation_endpoint():
+    return os.environ.get("BEDROCK_CLI_FEDERATION_ENDPOINT", FEDERATION_ENDPOINT)
+
+
+# returns a dict with AccessKeyId, SecretAccessKey and (maybe) SessionToken, or None if nothing could be found
+def find_credentials():
+    if os.environ.get("AWS_ACCESS_KEY_ID") and os.environ.get("AWS_SECRET_ACCESS_KEY"):
+        return {
+            "AccessKeyId": os.environ["AWS_ACCESS_KEY_ID"],
+            "SecretAccessKey": os.environ["AWS_SECRET_ACCESS_KEY"],
+            "SessionToken": os.environ.get("AWS_SESSION_TOKEN"),
+        }
+    try:
+        result = subprocess.run(['aws', 'configure', 'export-credentials', '--format', 'process'],
+                                capture_output=True, text=True)
+        result.check_returncode()
+        return json.loads(result.stdout)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+# the account the AWS credentials belong to, which is the account federated sign-in lands in, or None if the AWS CLI
+# can't say (no credentials, no CLI)
+def get_caller_account_id():
+    if "account" not in _caller_account_id:
+        try:
+            result = subprocess.run(['aws', 'sts', 'get-caller-identity', '--output', 'json'],
+                                    capture_output=True, text=True)
+            result.check_returncode()
+            _caller_account_id["account"] = json.loads(result.stdout)["Account"]
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+            _caller_account_id["account"] = None
+    return _caller_account_id["account"]
+
+
+def get_temporary_credentials():
+    credentials = find_credentials()
+    if credentials is None:
+        raise RuntimeError("No AWS credentials found for federated sign-in")
+
+    if not credentials.get("SessionToken"):
+        if config.is_verbose_mode():
+            print("Found long-term keys, requesting a federation token...")
+        env = dict(os.environ,
+                   AWS_ACCESS_KEY_ID=credentials["AccessKeyId"],
+                   AWS_SECRET_ACCESS_KEY=credentials["SecretAccessKey"])
+        env.pop("AWS_SESSION_TOKEN", None)
+        result = subprocess.run(
+            ['aws', 'sts', 'get-federation-token', '--name', FEDERATION_TOKEN_NAME,
+             '--policy-arns', f"arn={FEDERATION_POLICY_ARN}", '--output', 'json'],
+            capture_output=True, text=True, env=env
+        )
+        result.check_returncode()
+        credentials = json.loads(result.stdout)["Credentials"]
+
+    return credentials
+
+
+def get_signin_token(credentials):
+    session = {
+        "sessionId": credentials["AccessKeyId"],
+        "sessionKey": credentials["SecretAccessKey"],
+        "sessionToken": credentials["SessionToken"],
+    }
+    response = requests.get(get_federation_endpoint(),
+                            params={"Action": "getSigninToken", "Session": json.dumps(session)},
+                            timeout=30)
+    response.raise_for_status()
+    return response.json()["SigninToken"]
+
+
+def build_login_url(signin_token, destination_url):
+    query = urlencode({
+        "Action": "login",
+        "Issuer": ISSUER,
+        "Destination": destination_url,
+        "SigninToken": signin_token,
+    })
+    return f"{get_federation_endpoint()}?{query}"
+
+
+# everything up to the URL the browser should open; no browser involved
+def get_federated_login_url(destination_url):
+    credentials = get_temporary_credentials()
+    if config.is_verbose_mode():
+        print("Requesting console sign-in token from " + get_federation_endpoint())
+    return build_login_url(get_signin_token(credentials), destination_url)
+
+
+class StandInFederationHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        action = params.get("Action", [""])[0]
+        if action == "getSigninToken" and self.valid_session(params.get("Session", [""])[0]):
+            body = json.dumps({"SigninToken": "stand-in-token"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif action == "login" and params.get("SigninToken") == ["stand-in-token"]:
+            self.send_response(302)
+            self.send_header("Location", params["Destination"][0])
+            self.end_headers()
+        else:
+            self.send_error(400)
+
+    # like the real endpoint, only hands out a token for temporary credentials
+    @staticmethod
+    def valid_session(session_json):
+        try:
+            session = json.loads(session_json)
+        except ValueError:
+            return False
+        return isinstance(session, dict) and all(session.get(k) for k in ("sessionId", "sessionKey", "sessionToken"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stand_in(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), StandInFederationHandler)
+    print(f"Stand-in federation endpoint: http://{host}:{server.server_address[1]}/federation")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "stand-in":
+        serve_stand_in(int(sys.argv[2]) if len(sys.argv) > 2 else 8765)
+    else:
+        print("usage: python federation.py stand-in [port]")
+        sys.exit(1)
@@ -0,0 +1,78 @@
+# journal.py
+#
+# A durable record of an enable-foundation-model batch, so a run that dies halfway (a driver crash, a pre-empted
+# runner) can be picked up with --resume instead of redoing every login.  Each model in the batch is one item, keyed
+# "<account>/<region>/<model name>" like the cache, in one of these states:
+#
+#   pending     not tried yet, or tried and interrupted before anything was submitted
+#   submitted   the enablement request went in (or the console already shows it in progress)
+#   confirmed   the console shows access granted
+#   failed      preflight, the status check or the wizard failed; "error" says why
+#
+# The journal is a JSON file, rewritten after every state change: written to a temp file, fsynced and renamed into
+# place, so a crash leaves either the old journal or the new one, never half of one.  It isn't locked, so give runners
+# that run at the same time a journal each (e.g. --journal journal-<account>.json).
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+PENDING = "pending"
+SUBMITTED = "submitted"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+STATES = [PENDING, SUBMITTED, CONFIRMED, FAILED]
+
+DEFAULT_JOURNAL = "./journal.json"
+
+
+def item_key(account, region, model_name):
+    return f"{account}/{region}/{model_name}"
+
+
+# a path of None keeps the journal in memory only, for runs that shouldn't leave a record (--preflight-only)
+class Journal:
+    def __init__(self, path):
+        self.path = Path(path) if path is not None else None
+        self.items = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path, "r") as f:
+                self.items = json.load(f).get("items", {})
+
+    def state_of(self, key):
+        return self.items.get(key, {}).get("state")
+
+    def mark(self, key, state, error=None, status=None):
+        item = self.items.setdefault(key, {"attempts": 0})
+        if state == PENDING:
+            item["attempts"] = item.get("attempts", 0) + 1
+        item["state"] = state
+        item["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        item["error"] = error
+        if status is not None:
+            item["accessStatus"] = status
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-journal-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"items": self.items}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        # make the rename itself durable; directories can't be opened for this on Windows
+        if os.name == "posix":
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
@@ -0,0 +1,237 @@
+# metrics.py
+#
+# A very small Prometheus-style metrics registry.  Counters and latency histograms are kept in memory for the life of
+# the process and can be exported two ways:
+#
+#   * written to a node-exporter textfile (--metrics-textfile), which is what you want when this runs from cron.
+#     Every run adds its counts to whatever is already in the file, so the counters keep counting across runs.
+#   * served on http://<host>:<port>/metrics (--metrics-port) for as long as the process is alive.
+#
+# This deliberately doesn't depend on prometheus_client, to keep the install footprint the same as before.
+
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# name -> (type, help text).  Only metrics listed here can be recorded, so typos fail loudly.
+METRICS = {
+    "bedrock_cli_command_runs_total": (COUNTER, "CLI command invocations, by command and result."),
+    "bedrock_cli_command_duration_seconds": (HISTOGRAM, "Wall clock time of a CLI command."),
+    "bedrock_cli_login_attempts_total": (COUNTER, "Console logins attempted."),
+    "bedrock_cli_login_failures_total": (COUNTER, "Console logins that did not land on the console."),
+    "bedrock_cli_login_duration_seconds": (HISTOGRAM, "Time from browser launch to landing on the console."),
+    "bedrock_cli_scrape_duration_seconds": (HISTOGRAM, "Time spent scraping the model access table, by kind."),
+    "bedrock_cli_scrape_failures_total": (COUNTER, "Scrapes of the model access table that raised an error."),
+    "bedrock_cli_scrape_retries_total": (COUNTER, "Scrape retries in enhance_foundation_model_data()."),
+    "bedrock_cli_mfa_rejections_total": (COUNTER, "MFA codes the console didn't accept, by MFA method."),
+    "bedrock_cli_cache_requests_total": (COUNTER, "Enablement status cache lookups, by result (hit, miss, bypass)."),
+    "bedrock_cli_chromedriver_downloads_total": (COUNTER, "ChromeDriver downloads, by result."),
+    "bedrock_cli_chromedriver_download_duration_seconds": (HISTOGRAM, "Time spent downloading ChromeDriver."),
+    "bedrock_cli_last_run_timestamp_seconds": (GAUGE, "Unix time the last CLI run finished."),
+}
+
+_lock = threading.Lock()
+_values = {}  # (name, labels) -> float for counters and gauges
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$')
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _check(name, expected_type):
+    metric_type = METRICS.get(name, (None,))[0]
+    if metric_type != expected_type:
+        raise ValueError(f"{name} is not a registered {expected_type}")
+
+
+def inc(name, labels=None, amount=1):
+    _check(name, COUNTER)
+    key = (name, _label_key(labels))
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def set_gauge(name, value, labels=None):
+    _check(name, GAUGE)
+    with _lock:
+        _values[(name, _label_key(labels))] = value
+
+
+def observe(name, seconds, labels=None):
+    _check(name, HISTOGRAM)
+    key = (name, _label_key(labels))
+    with _lock:
+        hist = _histograms.setdefault(key, [0] * (len(DEFAULT_BUCKETS) + 2))
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[len(DEFAULT_BUCKETS)] += 1
+        hist[-1] += seconds
+
+
+# with metrics.timed("bedrock_cli_login_duration_seconds"): ... records the elapsed time, even if the body raises
+@contextmanager
+def timed(name, labels=None):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(name, time.monotonic() - start, labels)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+# returns the samples as an ordered list of (series, value), where series is the full "name{labels}" string
+def _samples():
+    samples = []
+    with _lock:
+        for (name, labels), value in _values.items():
+            samples.append((name + _format_labels(labels), value))
+        for (name, labels), hist in _histograms.items():
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                samples.append((name + "_bucket" + _format_labels(labels + (("le", _format_value(bound)),)), hist[i]))
+            samples.append((name + "_bucket" + _format_labels(labels + (("le", "+Inf"),)), hist[len(DEFAULT_BUCKETS)]))
+            samples.append((name + "_sum" + _format_labels(labels), hist[-1]))
+            samples.append((name + "_count" + _format_labels(labels), hist[len(DEFAULT_BUCKETS)]))
+    return samples
+
+
+def _metric_name(series):
+    base = series.split("{", 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if base.endswith(suffix) and base[:-len(suffix)] in METRICS:
+            return base[:-len(suffix)]
+    return base
+
+
+def render(samples=None):
+    if samples is None:
+        samples = _samples()
+    by_metric = {}
+    for series, value in samples:
+        by_metric.setdefault(_metric_name(series), []).append((series, value))
+
+    lines = []
+    for name in sorted(by_metric):
+        metric_type, help_text = METRICS.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for series, value in by_metric[name]:
+            lines.append(f"{series} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _read_textfile(path):
+    previous = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                match = _SAMPLE_RE.match(line.strip())
+                if match:
+                    previous[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    except (OSError, ValueError):
+        return {}
+    return previous
+
+
+# an exclusive lock on "<path>.lock", held for the whole read-merge-replace in write_textfile(), so overlapping runs
+# sharing a textfile queue up instead of losing each other's increments.  The textfile itself can't be locked, since
+# it's replaced by a rename.
+@contextmanager
+def _textfile_lock(path):
+    with open(path + ".lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# writes everything recorded so far to a node-exporter textfile.  Counter and histogram samples are added to the ones
+# already in the file; gauges are overwritten.  The file is replaced atomically so node-exporter never reads half of it.
+def write_textfile(path):
+    with _textfile_lock(path):
+        merged = _read_textfile(path)
+        for series, value in _samples():
+            if METRICS.get(_metric_name(series), (None,))[0] == GAUGE:
+                merged[series] = value
+            else:
+                merged[series] = merged.get(series, 0) + value
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".bedrock_cli_metrics")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(render(list(merged.items())))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# serves /metrics from a background thread for as long as the process lives.  Returns the server so callers can find
+# out which port was bound when port 0 is passed.
+def start_http_server(port, host=""):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,119 @@
+# mfa.py
+#
+# Where login_to_console() gets a code when the console asks for MFA.  Pick one with --mfa-method (or
+# BEDROCK_CLI_MFA_METHOD):
+#
+#   totp      generates RFC 6238 codes (30 second steps, 6 digits, HMAC-SHA1, which is what AWS virtual MFA devices use)
+#             from the device's base32 seed, looked up through the credentials chain: mfa_seed in the credentials file
+#             or keyring entry, BEDROCK_CLI_MFA_SEED, or MfaSeed from BEDROCK_CLI_CREDENTIAL_PROCESS.  The seed is the
+#             "secret key" AWS shows (or encodes in the QR code) when the virtual MFA device is assigned.
+#   command   runs BEDROCK_CLI_MFA_COMMAND and uses the code it prints, for seeds kept somewhere else (a password
+#             manager CLI, a hardware token bridge, ...)
+#   prompt    asks on the terminal, as before
+#   auto      the default: command if BEDROCK_CLI_MFA_COMMAND is set, else totp if there's a seed, else prompt
+#
+# Every provider has next_code(), which is called again for each retry if the console rejects a code.
+
+import base64
+import hashlib
+import hmac
+import os
+import shlex
+import struct
+import subprocess
+import sys
+import time
+
+import config
+import credentials
+
+TOTP_STEP = 30
+TOTP_DIGITS = 6
+# a code with less than this many seconds of its step left may be stale by the time the console checks it, so wait for
+# the next step instead
+MIN_SECONDS_LEFT = 3
+
+
+class MfaUnavailableError(RuntimeError):
+    pass
+
+
+def decode_seed(seed):
+    cleaned = seed.replace(" ", "").replace("-", "").upper()
+    try:
+        return base64.b32decode(cleaned + "=" * (-len(cleaned) % 8))
+    except ValueError:
+        raise MfaUnavailableError("The MFA seed isn't valid base32")
+
+
+# the RFC 6238 code for the time step containing for_time
+def totp(key, for_time, step=TOTP_STEP, digits=TOTP_DIGITS):
+    counter = int(for_time // step)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    value = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % (10 ** digits)).zfill(digits)
+
+
+class TotpProvider:
+    name = "totp"
+
+    def __init__(self, seed):
+        self.key = decode_seed(seed)
+        self.last_counter = None
+
+    # The console won't take the same code twice, so a retry (or a second login in the same step) waits for the next
+    # step rather than resending a code it's already used.  A code about to expire is skipped too.
+    def next_code(self):
+        now = time.time()
+        counter = int(now // TOTP_STEP)
+        seconds_left = TOTP_STEP - (now % TOTP_STEP)
+        if counter == self.last_counter or seconds_left < MIN_SECONDS_LEFT:
+            if config.is_verbose_mode():
+                print(f"Waiting {seconds_left:.1f}s for the next MFA time step...")
+            time.sleep(seconds_left)
+            counter += 1
+        self.last_counter = counter
+        return totp(self.key, counter * TOTP_STEP)
+
+
+class CommandProvider:
+    name = "command"
+
+    def __init__(self, command):
+        self.command = command
+
+    def next_code(self):
+        result = subprocess.run(shlex.split(self.command), capture_output=True, text=True)
+        code = result.stdout.strip()
+        if result.returncode != 0 or not code:
+            raise MfaUnavailableError(f"MFA command failed: {result.stderr.strip() or 'it printed nothing'}")
+        return code
+
+
+class PromptProvider:
+    name = "prompt"
+
+    def next_code(self):
+        if not sys.stdin.isatty():
+            raise MfaUnavailableError("The console asked for an MFA code and there's no terminal to ask for one.  "
+                                      "Store a TOTP seed or set BEDROCK_CLI_MFA_COMMAND")
+        return input("Type your MFA code: ").strip()
+
+
+def get_mfa_provider(method=None):
+    if method is None:
+        method = config.get_mfa_method()
+    command = os.environ.get("BEDROCK_CLI_MFA_COMMAND")
+    if method == "command" or (method == "auto" and command):
+        if not command:
+            raise MfaUnavailableError("--mfa-method command needs BEDROCK_CLI_MFA_COMMAND")
+        return CommandProvider(command)
+    if method in ("totp", "auto"):
+        seed = credentials.get_mfa_seed()
+        if seed:
+            return TotpProvider(seed)
+        if method == "totp":
+            raise MfaUnavailableError("--mfa-method totp needs an MFA seed: set BEDROCK_CLI_MFA_SEED, or add mfa_seed "
+                                      "to the credentials file or keyring")
+    return PromptProvider()
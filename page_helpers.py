@@ -0,0 +1,209 @@
+# page_helpers.py
+#
+# A small JavaScript library that lives in the page as window.__bedrockCli, so the Python side doesn't have to ship a
+# fresh script with every call or poll the page from outside.  install() registers it with
+# Page.addScriptToEvaluateOnNewDocument once per browser session, so every document the browser loads after that has
+# it before the page's own scripts run, and also runs it in the current document.
+#
+# call() runs one helper through execute_async_script.  Arguments go through WebDriver's own JSON serialization, never
+# string formatting, so quotes and apostrophes in values are safe.  Every helper resolves with an object that has "ok"
+# (and "error" when it isn't ok), so Python always finds out whether it worked.
+
+from selenium.common.exceptions import WebDriverException
+
+HELPERS_JS = r"""
+(function () {
+    if (window.__bedrockCli) return;
+
+    function clickElement(element) {
+        const rect = element.getBoundingClientRect();
+        ["mouseover", "mousedown", "mouseup", "click"].forEach(type => {
+            element.dispatchEvent(new MouseEvent(type, {
+                bubbles: true,
+                cancelable: true,
+                clientX: rect.left + rect.width / 2,
+                clientY: rect.top + rect.height / 2,
+                view: window
+            }));
+        });
+    }
+
+    // resolves with find()'s result as soon as it's truthy, checking now and on every DOM change
+    function waitFor(find, timeoutMs) {
+        return new Promise((resolve, reject) => {
+            const found = find();
+            if (found) return resolve(found);
+            const observer = new MutationObserver(() => {
+                const found = find();
+                if (found) {
+                    observer.disconnect();
+                    clearTimeout(timer);
+                    resolve(found);
+                }
+            });
+            const timer = setTimeout(() => {
+                observer.disconnect();
+                reject(new Error("timed out"));
+            }, timeoutMs);
+            observer.observe(document.documentElement, { childList: true, subtree: true, attributes: true });
+        });
+    }
+
+    function byName(name) {
+        return document.getElementsByName(name)[0] || null;
+    }
+
+    // how many resources this document has loaded.  performance.getEntriesByType("resource") stops growing once the
+    // resource timing buffer is full (250 entries by default, which the console gets through quickly), after which a
+    // busy page would look quiet, so count them with an observer instead.  The buffer is enlarged too, for the
+    // entries the observer replays from before it was registered.
+    let resourceCount = 0;
+    performance.setResourceTimingBufferSize(100000);
+    try {
+        new PerformanceObserver(list => { resourceCount += list.getEntries().length; })
+            .observe({ type: "resource", buffered: true });
+    } catch (e) {
+        resourceCount = -1;  // no observer support; resourcesLoaded() reads the (enlarged) buffer instead
+    }
+
+    function resourcesLoaded() {
+        return resourceCount < 0 ? performance.getEntriesByType("resource").length : resourceCount;
+    }
+
+    // AWS's UI library listens for the native value setter plus input/change events, not plain .value assignment
+    function setValue(input, value) {
+        input.focus();
+        const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(input), "value");
+        if (setter && setter.set) setter.set.call(input, value); else input.value = value;
+        input.dispatchEvent(new InputEvent("input", { bubbles: true }));
+        input.dispatchEvent(new Event("change", { bubbles: true }));
+    }
+
+    const helpers = {
+        // opens the dropdown behind buttonSelector and picks the first option containing optionText.  AWS's dropdowns
+        // ignore a plain click, so this sends the whole mouseover / mousedown / mouseup / click sequence.
+        selectDropdownOption: async function (buttonSelector, optionText, timeoutMs) {
+            const button = document.querySelector(buttonSelector);
+            if (!button) return { ok: false, error: "dropdown " + buttonSelector + " not found" };
+            clickElement(button);
+            const wanted = optionText.toLowerCase();
+            try {
+                const option = await waitFor(() => Array.from(document.querySelectorAll("[role='option']"))
+                    .find(node => node.textContent.trim().toLowerCase().includes(wanted)), timeoutMs);
+                clickElement(option);
+                return { ok: true };
+            } catch (e) {
+                return { ok: false, error: "option '" + optionText + "' never appeared" };
+            }
+        },
+
+        fillField: async function (name, value) {
+            const input = byName(name);
+            if (!input) return { ok: true, found: false };
+            setValue(input, value);
+            return { ok: true, found: true };
+        },
+
+        setCheckbox: async function (name, checked, timeoutMs) {
+            let checkbox;
+            try {
+                checkbox = await waitFor(() => byName(name), timeoutMs);
+            } catch (e) {
+                return { ok: false, error: "checkbox " + name + " not found" };
+            }
+            if (checkbox.checked !== checked) checkbox.click();
+            return { ok: checkbox.checked === checked };
+        },
+
+        // the Anthropic use case form: industry "Other" plus free text, and the intended users checkboxes
+        fillUseCaseForm: async function (industryName, checkInternal, checkExternal, timeoutMs) {
+            const selected = await helpers.selectDropdownOption("button[id^='formField:']", "Other", timeoutMs);
+            if (!selected.ok) return selected;
+            if (industryName) {
+                let industry;
+                try {
+                    industry = await waitFor(() => byName("otherIndustry"), timeoutMs);
+                } catch (e) {
+                    return { ok: false, error: "otherIndustry field never appeared" };
+                }
+                setValue(industry, industryName);
+            }
+            for (const [name, wanted] of [["intendedUsers.internal", checkInternal],
+                                          ["intendedUsers.external", checkExternal]]) {
+                if (!wanted) continue;
+                const result = await helpers.setCheckbox(name, true, timeoutMs);
+                if (!result.ok) return result;
+            }
+            return { ok: true };
+        },
+
+        // the text of every cell of every body row, in one round trip
+        extractTable: async function (rowSelector) {
+            const rows = Array.from(document.querySelectorAll(rowSelector))
+                .map(row => Array.from(row.querySelectorAll("td")).map(cell => cell.innerText || ""));
+            return { ok: true, rows: rows };
+        },
+
+        // resolves once the document has loaded and no new network requests have started for quietMs
+        waitForSettle: function (quietMs, timeoutMs) {
+            return new Promise(resolve => {
+                const started = performance.now();
+                let lastCount = -1;
+                let quietSince = started;
+                (function check() {
+                    const now = performance.now();
+                    const count = resourcesLoaded();
+                    if (document.readyState !== "complete" || count !== lastCount) {
+                        lastCount = count;
+                        quietSince = now;
+                    }
+                    if (now - quietSince >= quietMs) return resolve({ ok: true, elapsedMs: now - started });
+                    if (now - started >= timeoutMs) return resolve({ ok: false, error: "page never settled" });
+                    setTimeout(check, 50);
+                })();
+            });
+        }
+    };
+
+    window.__bedrockCli = helpers;
+    // not a helper for call(): answers synchronously, for polling from outside the page
+    window.__bedrockCliResourcesLoaded = resourcesLoaded;
+})();
+"""
+
+# for polling from outside the page: [document.readyState, resources loaded so far], using the library's count when the
+# document has it, or else the resource timing buffer, enlarged so it doesn't stop counting at 250
+SETTLE_STATE_JS = """
+if (window.__bedrockCliResourcesLoaded) return [document.readyState, window.__bedrockCliResourcesLoaded()];
+performance.setResourceTimingBufferSize(100000);
+return [document.readyState, performance.getEntriesByType("resource").length];
+"""
+
+CALL_JS = """
+const done = arguments[arguments.length - 1];
+const name = arguments[0];
+const args = Array.prototype.slice.call(arguments, 1, arguments.length - 1);
+if (!window.__bedrockCli) { done({ ok: false, error: "not-installed" }); return; }
+Promise.resolve()
+    .then(() => window.__bedrockCli[name].apply(null, args))
+    .then(done, e => done({ ok: false, error: String(e) }));
+"""
+
+
+def install(driver):
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HELPERS_JS})
+    driver.execute_script(HELPERS_JS)
+
+
+# runs window.__bedrockCli[helper](*args) and returns what it resolved with.  script_timeout (seconds) must be longer
+# than any timeout passed to the helper itself.  If the page somehow doesn't have the library (e.g. a document that
+# was already loading when install() ran) it's installed there and the call is retried once.
+def call(driver, helper, *args, script_timeout=60):
+    driver.set_script_timeout(script_timeout)
+    result = driver.execute_async_script(CALL_JS, helper, *args)
+    if isinstance(result, dict) and result.get("error") == "not-installed":
+        driver.execute_script(HELPERS_JS)
+        result = driver.execute_async_script(CALL_JS, helper, *args)
+    if not isinstance(result, dict):
+        raise WebDriverException(f"Page helper {helper} returned {result!r}")
+    return result
@@ -0,0 +1,197 @@
+# preflight.py
+#
+# Checks that run before enable-foundation-model launches a browser, so a run that's going to fail fails in
+# milliseconds instead of after a 30+ second login.  Nothing in here starts Chrome or talks to AWS; model checks only
+# use the cached catalog, and are skipped if there's no fresh cache entry.
+#
+# Every check returns a list of problems, each a (message, exit code) pair.  Exit code 2 is used for a model that
+# isn't in "Available to request" status, the same as enable-foundation-model always has; everything else is 1, and
+# wins if there's more than one kind of problem.
+
+import shutil
+import subprocess
+import sys
+from urllib.parse import urlparse
+
+import catalog
+import chrome_install_mgr
+import config
+import credentials
+import federation
+import mfa
+
+AVAILABLE_STATUS = "Available to request"
+
+# providers whose models need the extra use case form, and the arguments that fill it in
+PROVIDER_REQUIRED_FIELDS = {
+    "anthropic": ["company_name", "company_website_url", "industry", "internal_employees", "external_users",
+                  "use_case_description"],
+}
+
+TRUE_VALUES = {"true", "yes", "y", "1"}
+FALSE_VALUES = {"false", "no", "n", "0"}
+
+
+# "true"/"yes"/"1" -> True, "false"/"no"/"0" -> False, None -> None, anything else is a ValueError
+def parse_flag(value):
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"'{value}' is not a yes/no value (use true/false, yes/no or 1/0)")
+
+
+def major_version(version_text):
+    for word in version_text.split():
+        if word[:1].isdigit() and "." in word:
+            return word.split(".")[0]
+    return None
+
+
+def check_browser():
+    if config.get_browser_backend() == "cdp":
+        try:
+            chrome_install_mgr.find_chrome_binary()
+        except RuntimeError as e:
+            return [(str(e), 1)]
+        return []
+
+    chromedriver_path = shutil.which("chromedriver")
+    try:
+        chrome_version = chrome_install_mgr.get_chrome_version()
+    except (RuntimeError, OSError) as e:
+        if not chromedriver_path:
+            return [(f"Chrome doesn't appear to be installed: {e}", 1)]
+        # get_chrome_version() doesn't know every install (Chromium, a system-wide Chrome on Windows), and the
+        # chromedriver on the PATH doesn't need it, so all we lose is the compatibility check
+        print(f"Warning: unable to find the Chrome version ({e}); not checking it against {chromedriver_path}",
+              file=sys.stderr)
+        return []
+
+    if not chromedriver_path:
+        return []  # ensure_chromedriver_installed() will download a matching one
+
+    try:
+        result = subprocess.run([chromedriver_path, "--version"], capture_output=True, text=True, timeout=10)
+        driver_version = result.stdout.strip()
+    except (OSError, subprocess.SubprocessError) as e:
+        return [(f"Unable to run {chromedriver_path}: {e}", 1)]
+
+    if major_version(driver_version) != major_version(chrome_version):
+        return [(f"ChromeDriver at {chromedriver_path} ({driver_version}) doesn't match Chrome {chrome_version}.  "
+                 f"Remove it from the PATH to have a matching one downloaded, or update it.", 1)]
+    return []
+
+
+# whether login will be federated: --login-method federation and AWS credentials to federate with.  Federated sign-in
+# needs neither console credentials nor MFA.
+def federation_ready():
+    return config.get_login_method() == "federation" and federation.find_credentials() is not None
+
+
+# credentials are resolved lazily at login, so all this can check is that they could be resolved without hanging
+def check_credentials(federated=False):
+    if federated:
+        return []
+    try:
+        missing, can_prompt = credentials.unresolvable_fields()
+    except credentials.CredentialsUnavailableError as e:
+        return [(str(e), 1)]
+    if missing and not can_prompt:
+        return [(f"No console credentials for {', '.join(missing)}, and no terminal to ask for them on.  Set "
+                 f"{', '.join(credentials.ENV_KEYS[f] for f in missing)}, add them to the credentials file or "
+                 f"keyring, or set BEDROCK_CLI_CREDENTIAL_PROCESS", 1)]
+    return []
+
+
+# whether the console asks for MFA isn't known until login, so this only checks an MFA method that's been asked for
+# is actually set up
+def check_mfa(federated=False):
+    if federated:
+        return []
+    try:
+        mfa.get_mfa_provider()
+    except mfa.MfaUnavailableError as e:
+        return [(str(e), 1)]
+    return []
+
+
+# model_index is a catalog.CatalogIndex over a fresh cache entry, or None when there isn't one
+def check_model(model_name, model_index):
+    if model_index is None:
+        return []
+    if not model_index.find(model_name):
+        return [(f"Model {model_name} not found in the foundation model catalog", 1)]
+    try:
+        status = model_index.status_of(model_name)
+    except catalog.AmbiguousModelError as e:
+        return [(str(e), 1)]
+    if status != AVAILABLE_STATUS:
+        return [(f"Model {model_name} is not in '{AVAILABLE_STATUS}' status.  Status = {status}", 2)]
+    return []
+
+
+# which provider's form rules apply.  Taken from the catalog when we have it, otherwise guessed from the model name.
+# Raises catalog.AmbiguousModelError if the name matches models from different providers.
+def provider_for(model_name, model_index):
+    if model_index is not None and model_index.find(model_name):
+        return (model_index.provider_of(model_name) or "").lower()
+    if "claude" in model_name.lower():
+        return "anthropic"
+    return None
+
+
+def check_provider_fields(args, provider):
+    required_fields = PROVIDER_REQUIRED_FIELDS.get(provider, [])
+    missing_fields = [field for field in required_fields if getattr(args, field, None) is None]
+    if missing_fields:
+        return [(f"The following parameters are required for {provider.title()} models: "
+                 f"{', '.join('--' + f.replace('_', '-') for f in missing_fields)}", 1)]
+    if required_fields:
+        try:
+            flags = [parse_flag(args.internal_employees), parse_flag(args.external_users)]
+        except ValueError:
+            return []  # already reported by check_fields()
+        if not any(flags):
+            return [("At least one of --internal-employees and --external-users must be true", 1)]
+    return []
+
+
+def check_fields(args):
+    problems = []
+    for field in ("internal_employees", "external_users"):
+        try:
+            parse_flag(getattr(args, field, None))
+        except ValueError as e:
+            problems.append((f"--{field.replace('_', '-')}: {e}", 1))
+
+    url = getattr(args, "company_website_url", None)
+    if url is not None:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            problems.append((f"--company-website-url: '{url}' is not an http(s) URL", 1))
+
+    for field in ("company_name", "industry", "use_case_description"):
+        value = getattr(args, field, None)
+        if value is not None and not value.strip():
+            problems.append((f"--{field.replace('_', '-')} is blank", 1))
+    return problems
+
+
+def run_preflight(args, model_index):
+    problems = []
+    problems += check_fields(args)
+    problems += check_model(args.model_name, model_index)
+    try:
+        problems += check_provider_fields(args, provider_for(args.model_name, model_index))
+    except catalog.AmbiguousModelError as e:
+        problems.append((str(e), 1))
+    # finding federation credentials can mean running the AWS CLI, so it's only done once
+    federated = federation_ready()
+    problems += check_credentials(federated)
+    problems += check_mfa(federated)
+    problems += check_browser()
+    return problems
@@ -0,0 +1,80 @@
+import json
+import socket
+import struct
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+import browser
+
+
+# the browser's end of the DevTools websocket: unmasked frames, as Chrome sends them
+def frame(text, opcode=0x1, final=True):
+    payload = text.encode()
+    header = bytes([(0x80 if final else 0) | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    else:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    return header + payload
+
+
+@pytest.fixture
+def devtools():
+    ours, theirs = socket.socketpair()
+    websocket = object.__new__(browser.WebSocket)
+    websocket.sock = ours
+    websocket.buffer = b""
+    websocket.fragments = b""
+    yield websocket, theirs
+    ours.close()
+    theirs.close()
+
+
+@pytest.fixture
+def driver(devtools):
+    websocket, theirs = devtools
+    cdp = object.__new__(browser.CdpDriver)
+    cdp.socket = websocket
+    cdp.events = []
+    cdp.next_id = 0
+    cdp.script_timeout = browser.DEFAULT_SCRIPT_TIMEOUT
+    return cdp, theirs
+
+
+def test_recv_timing_out_mid_frame_keeps_the_stream(devtools):
+    websocket, theirs = devtools
+    message = json.dumps({"id": 1, "result": {"value": "x" * 300}})
+    data = frame(message)
+    theirs.sendall(data[:3])
+    websocket.sock.settimeout(0.1)
+    with pytest.raises(socket.timeout):
+        websocket.recv()
+    theirs.sendall(data[3:])
+    assert websocket.recv() == message
+
+
+def test_recv_joins_fragments(devtools):
+    websocket, theirs = devtools
+    theirs.sendall(frame('{"id": 1, ', final=False) + frame('"result": {}}', opcode=0x0))
+    websocket.sock.settimeout(1)
+    assert json.loads(websocket.recv()) == {"id": 1, "result": {}}
+
+
+def test_command_times_out_and_its_late_answer_is_dropped(driver):
+    cdp, theirs = driver
+    with pytest.raises(TimeoutException):
+        cdp.execute_cdp_cmd("Runtime.evaluate", {}, timeout=0.1)
+    theirs.sendall(frame(json.dumps({"id": 1, "result": {"late": True}})))
+    theirs.sendall(frame(json.dumps({"id": 2, "result": {"late": False}})))
+    assert cdp.execute_cdp_cmd("Runtime.evaluate", {}, timeout=1) == {"late": False}
+
+
+def test_async_script_waits_past_the_command_timeout(driver, monkeypatch):
+    cdp, theirs = driver
+    waited = []
+    monkeypatch.setattr(cdp, "execute_cdp_cmd", lambda cmd, cmd_args, timeout: waited.append(timeout) or {
+        "result": {"value": {"ok": True}}})
+    cdp.set_script_timeout(120)
+    assert cdp.execute_async_script("arguments[0]({ok: true});") == {"ok": True}
+    assert waited == [120 + browser.SCRIPT_ANSWER_MARGIN]
@@ -0,0 +1,141 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import cache_backends
+
+KEY = "123456789012/us-east-1/models"
+
+
+@pytest.fixture
+def stand_in_url():
+    cache_backends.StandInKeyValueHandler.store = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), cache_backends.StandInKeyValueHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/bedrock-cli"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["dir", "sqlite", "http"])
+def spec(request, tmp_path):
+    if request.param == "dir":
+        return f"dir:{tmp_path / 'cache'}"
+    if request.param == "sqlite":
+        return f"sqlite:{tmp_path / 'cache.db'}"
+    return request.getfixturevalue("stand_in_url")
+
+
+def test_put_then_get(spec):
+    cache = cache_backends.get_cache_backend(spec)
+    cache.put(KEY, {"modelSummaries": [{"modelId": "a.b-v1:0"}]})
+    assert cache.get(KEY, 60) == {"modelSummaries": [{"modelId": "a.b-v1:0"}]}
+    assert cache.get("123456789012/us-west-2/models", 60) is None
+
+
+def test_entries_expire(spec):
+    cache = cache_backends.get_cache_backend(spec)
+    cache.put(KEY, {"x": 1})
+    time.sleep(0.05)
+    assert cache.get(KEY, 0.01) is None
+
+
+def test_purge_removes_expired_entries_but_not_leases(spec):
+    cache = cache_backends.get_cache_backend(spec)
+    cache.put(KEY, {"x": 1})
+    assert cache.acquire_lease(KEY, 60)
+    time.sleep(0.05)
+    cache.purge(0.01)
+    assert cache.get(KEY, 60) is None or spec.startswith("http")  # the http backend leaves expiry to the server
+    assert not cache_backends.get_cache_backend(spec).acquire_lease(KEY, 60)
+
+
+def test_second_runner_cannot_take_a_held_lease(spec):
+    first, second = cache_backends.get_cache_backend(spec), cache_backends.get_cache_backend(spec)
+    assert first.acquire_lease(KEY, 60)
+    assert not second.acquire_lease(KEY, 60)
+    first.release_lease(KEY)
+    assert second.acquire_lease(KEY, 60)
+
+
+def test_expired_lease_is_taken_over_once(spec):
+    stale, second, third = (cache_backends.get_cache_backend(spec) for _ in range(3))
+    assert stale.acquire_lease(KEY, 0.01)
+    time.sleep(0.05)
+    assert second.acquire_lease(KEY, 60)
+    assert not third.acquire_lease(KEY, 60)
+
+
+def test_stale_holder_release_keeps_the_new_lease(spec):
+    stale, second, third = (cache_backends.get_cache_backend(spec) for _ in range(3))
+    assert stale.acquire_lease(KEY, 0.01)
+    time.sleep(0.05)
+    assert second.acquire_lease(KEY, 60)
+    stale.release_lease(KEY)
+    assert not third.acquire_lease(KEY, 60)
+
+
+def test_concurrent_takeover_has_one_winner(spec):
+    assert cache_backends.get_cache_backend(spec).acquire_lease(KEY, 0.01)
+    time.sleep(0.05)
+    runners = [cache_backends.get_cache_backend(spec) for _ in range(8)]
+    results = []
+    threads = [threading.Thread(target=lambda r=r: results.append(r.acquire_lease(KEY, 60))) for r in runners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+
+def test_unreachable_http_cache():
+    cache = cache_backends.get_cache_backend("http://127.0.0.1:1/bedrock-cli")
+    assert cache.get(KEY, 60) is None
+    with pytest.raises(cache_backends.CacheUnavailableError):
+        cache.acquire_lease(KEY, 60)
+    with pytest.raises(cache_backends.CacheUnavailableError):
+        cache.put(KEY, {"x": 1})
+
+
+def test_unusable_sqlite_cache(tmp_path):
+    with pytest.raises(cache_backends.CacheUnavailableError):
+        cache_backends.get_cache_backend(f"sqlite:{tmp_path / 'missing' / 'cache.db'}")
+
+    path = tmp_path / "cache.db"
+    cache = cache_backends.get_cache_backend(f"sqlite:{path}")
+    path.write_bytes(b"not a database" * 100)
+    assert cache.get(KEY, 60) is None
+    for call in (lambda: cache.put(KEY, {"x": 1}), lambda: cache.delete(KEY), lambda: cache.purge(60),
+                 lambda: cache.acquire_lease(KEY, 60)):
+        with pytest.raises(cache_backends.CacheUnavailableError):
+            call()
+    cache.release_lease(KEY)
+
+
+def test_unusable_dir_cache(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    cache = cache_backends.get_cache_backend(f"dir:{blocker / 'cache'}")
+    assert cache.get(KEY, 60) is None
+    for call in (lambda: cache.put(KEY, {"x": 1}), lambda: cache.delete(KEY), lambda: cache.acquire_lease(KEY, 60)):
+        with pytest.raises(cache_backends.CacheUnavailableError):
+            call()
+    cache.purge(60)  # nothing there to purge
+    cache.release_lease(KEY)
+
+
+@pytest.mark.parametrize("spec", ["", "dir:", "sqlite:", "redis://localhost", "./cache"])
+def test_unknown_spec(spec):
+    with pytest.raises(ValueError):
+        cache_backends.parse_cache_spec(spec)
+
+
+def test_delete(spec):
+    cache = cache_backends.get_cache_backend(spec)
+    cache.put(KEY, {"x": 1})
+    cache.delete(KEY)
+    assert cache.get(KEY, 60) is None
+    cache.delete(KEY)
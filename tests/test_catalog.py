@@ -0,0 +1,93 @@
+import pytest
+
+import catalog
+
+
+def summaries(*model_ids, name="Claude", provider="Anthropic"):
+    return [{"modelId": model_id, "modelName": name, "providerName": provider} for model_id in model_ids]
+
+
+CLAUDE_2 = summaries("anthropic.claude-v2", "anthropic.claude-v2:0:18k", "anthropic.claude-v2:0:100k",
+                     "anthropic.claude-v2:1", "anthropic.claude-v2:1:18k", "anthropic.claude-v2:1:200k")
+SONNET = summaries("anthropic.claude-3-sonnet-20240229-v1:0", "anthropic.claude-3-sonnet-20240229-v1:0:28k",
+                   "anthropic.claude-3-sonnet-20240229-v1:0:200k", name="Claude 3 Sonnet")
+
+
+def row(name, status, text=""):
+    return {"name": name, "status": status, "text": f"{name}\n{status}\n{text}"}
+
+
+def statuses(model_data):
+    return {model["modelId"]: model["accessStatus"] for model in model_data["modelSummaries"]}
+
+
+@pytest.mark.parametrize("model_id, base_id", [
+    ("anthropic.claude-v2", "anthropic.claude-v2"),
+    ("anthropic.claude-v2:0:18k", "anthropic.claude-v2"),
+    ("anthropic.claude-v2:1", "anthropic.claude-v2:1"),
+    ("anthropic.claude-v2:1:200k", "anthropic.claude-v2:1"),
+    ("anthropic.claude-3-sonnet-20240229-v1:0:28k", "anthropic.claude-3-sonnet-20240229-v1"),
+])
+def test_base_model_id(model_id, base_id):
+    assert catalog.base_model_id(model_id) == base_id
+
+
+def test_one_row_covers_every_version_with_its_name():
+    index = catalog.CatalogIndex({"modelSummaries": CLAUDE_2 + SONNET})
+    model_data = index.apply_access_status([row("Claude", "Access granted"),
+                                            row("Claude 3 Sonnet", "Available to request")])
+    assert statuses(model_data) == {**{m["modelId"]: "Access granted" for m in CLAUDE_2},
+                                    **{m["modelId"]: "Available to request" for m in SONNET}}
+    assert index.status_of("Claude") == "Access granted"
+    assert not any("accessStatusNote" in m for m in model_data["modelSummaries"])
+
+
+def test_rows_are_matched_by_the_model_id_in_their_text():
+    index = catalog.CatalogIndex({"modelSummaries": list(CLAUDE_2)})
+    model_data = index.apply_access_status([row("Claude", "Available to request", "anthropic.claude-v2:1"),
+                                            row("Claude", "Access granted", "anthropic.claude-v2")])
+    assert statuses(model_data) == {
+        "anthropic.claude-v2": "Access granted",
+        "anthropic.claude-v2:0:18k": "Access granted",
+        "anthropic.claude-v2:0:100k": "Access granted",
+        "anthropic.claude-v2:1": "Available to request",
+        "anthropic.claude-v2:1:18k": "Available to request",
+        "anthropic.claude-v2:1:200k": "Available to request",
+    }
+
+
+def test_one_identified_row_leaves_the_other_to_the_remaining_version():
+    index = catalog.CatalogIndex({"modelSummaries": list(CLAUDE_2)})
+    model_data = index.apply_access_status([row("Claude", "Access granted"),
+                                            row("Claude", "In Progress", "anthropic.claude-v2:1")])
+    assert statuses(model_data)["anthropic.claude-v2:0:18k"] == "Access granted"
+    assert statuses(model_data)["anthropic.claude-v2:1:200k"] == "In Progress"
+
+
+def test_rows_that_cannot_be_told_apart_are_not_guessed():
+    index = catalog.CatalogIndex({"modelSummaries": list(CLAUDE_2)})
+    model_data = index.apply_access_status([row("Claude", "Access granted"), row("Claude", "Available to request")])
+    assert set(statuses(model_data).values()) == {catalog.UNKNOWN_STATUS}
+    assert all("accessStatusNote" in m for m in model_data["modelSummaries"])
+
+
+def test_status_of_refuses_to_pick_between_disagreeing_versions():
+    index = catalog.CatalogIndex({"modelSummaries": list(CLAUDE_2)})
+    index.apply_access_status([row("Claude", "Available to request", "anthropic.claude-v2:1"),
+                               row("Claude", "Access granted", "anthropic.claude-v2")])
+    with pytest.raises(catalog.AmbiguousModelError) as error:
+        index.status_of("Claude")
+    assert "anthropic.claude-v2:1" in error.value.candidates
+    assert index.status_of("anthropic.claude-v2:1") == "Available to request"
+    assert index.status_of("No such model") == catalog.UNKNOWN_STATUS
+
+
+def test_preflight_reports_ambiguous_names_with_their_model_ids():
+    import preflight
+
+    index = catalog.CatalogIndex({"modelSummaries": list(CLAUDE_2)})
+    index.apply_access_status([row("Claude", "Available to request", "anthropic.claude-v2:1"),
+                               row("Claude", "Access granted", "anthropic.claude-v2")])
+    [(message, exit_code)] = preflight.check_model("Claude", index)
+    assert exit_code == 1 and "anthropic.claude-v2:1" in message
+    assert preflight.check_model("anthropic.claude-v2:1", index) == []
@@ -0,0 +1,99 @@
+import json
+import os
+import stat
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+import federation
+
+DESTINATION = "https://us-east-1.console.aws.amazon.com/bedrock/home?region=us-east-1#/modelaccess"
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), federation.StandInFederationHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/federation"
+    monkeypatch.setenv("BEDROCK_CLI_FEDERATION_ENDPOINT", url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "ASIASTANDIN")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "session-token")
+
+
+def test_login_url_carries_the_exchanged_token(endpoint, session_credentials):
+    login_url = federation.get_federated_login_url(DESTINATION)
+
+    parsed = urlparse(login_url)
+    assert f"{parsed.scheme}://{parsed.netloc}{parsed.path}" == endpoint
+    query = parse_qs(parsed.query)
+    assert query == {"Action": ["login"], "Issuer": [federation.ISSUER], "Destination": [DESTINATION],
+                     "SigninToken": ["stand-in-token"]}
+
+
+def test_login_url_redirects_to_the_destination(endpoint, session_credentials):
+    response = requests.get(federation.get_federated_login_url(DESTINATION), allow_redirects=False, timeout=10)
+    assert response.status_code == 302
+    assert response.headers["Location"] == DESTINATION
+
+
+def test_token_needs_temporary_credentials(endpoint):
+    with pytest.raises(requests.HTTPError):
+        federation.get_signin_token({"AccessKeyId": "AKIASTANDIN", "SecretAccessKey": "secret", "SessionToken": None})
+
+
+# a stand-in aws CLI that prints output and counts its runs in calls.log
+def fake_aws(monkeypatch, tmp_path, output):
+    aws = tmp_path / "aws"
+    aws.write_text(f"#!/bin/sh\necho run >> '{tmp_path / 'calls.log'}'\necho '{json.dumps(output)}'\n")
+    aws.chmod(aws.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+    return tmp_path / "calls.log"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as a stand-in aws CLI")
+def test_caller_account_is_asked_for_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(federation, "_caller_account_id", {})
+    calls = fake_aws(monkeypatch, tmp_path, {"Account": "111122223333", "Arn": "arn:aws:sts::111122223333:x"})
+    assert federation.get_caller_account_id() == "111122223333"
+    assert federation.get_caller_account_id() == "111122223333"
+    assert len(calls.read_text().splitlines()) == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as a stand-in aws CLI")
+def test_federated_sign_in_to_another_account_is_refused(monkeypatch, tmp_path):
+    import bedrock_cli
+    import config
+    import credentials
+
+    monkeypatch.setattr(federation, "_caller_account_id", {})
+    fake_aws(monkeypatch, tmp_path, {"Account": "999999999999"})
+    monkeypatch.setattr(config, "ACCOUNT_ID", "111122223333")
+    monkeypatch.setattr(credentials, "_resolved", {})
+    with pytest.raises(ValueError, match="999999999999"):
+        bedrock_cli.federated_login_to_console()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as a stand-in aws CLI")
+def test_long_term_keys_are_traded_for_a_federation_token(endpoint, monkeypatch, tmp_path):
+    fake_aws(monkeypatch, tmp_path, {"Credentials": {
+        "AccessKeyId": "ASIAFEDERATED", "SecretAccessKey": "federated-secret", "SessionToken": "federated-token",
+    }})
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIASTANDIN")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.delenv("AWS_SESSION_TOKEN", raising=False)
+
+    query = parse_qs(urlparse(federation.get_federated_login_url(DESTINATION)).query)
+    assert query["SigninToken"] == ["stand-in-token"]
@@ -0,0 +1,54 @@
+import argparse
+
+import pytest
+
+import bedrock_cli
+import config
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def save_screenshot(self, path):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def args(*models):
+    return argparse.Namespace(models=list(models), no_cache=True, output="json")
+
+
+@pytest.fixture
+def console(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "VERBOSE_MODE", False)
+    monkeypatch.setattr(bedrock_cli, "load_model_data", lambda: {"modelSummaries": [
+        {"modelId": "amazon.titan-text-express-v1", "modelName": "Titan Text G1 - Express", "providerName": "Amazon"},
+    ]})
+    driver = FakeDriver()
+    monkeypatch.setattr(bedrock_cli, "login_to_console", lambda url: driver)
+    return driver
+
+
+def test_status_decides_the_exit_code(monkeypatch, console):
+    monkeypatch.setattr(bedrock_cli, "scrape_access_status_for_models", lambda driver, names: [
+        {"name": "Titan Text G1 - Express", "status": "Access granted", "text": "Titan Text G1 - Express"},
+    ])
+    with pytest.raises(SystemExit) as exit_info:
+        bedrock_cli.get_model_status(args("Titan Text G1 - Express"))
+    assert exit_info.value.code == 0
+
+
+def test_failed_scrape_is_an_error_not_unknown(monkeypatch, console, capsys):
+    def broken(driver):
+        raise RuntimeError("page never loaded")
+
+    monkeypatch.setattr(bedrock_cli, "navigate_to_model_list", broken)
+    with pytest.raises(SystemExit) as exit_info:
+        bedrock_cli.get_model_status(args("Titan Text G1 - Express"))
+    assert exit_info.value.code == 1
+    assert "page never loaded" in capsys.readouterr().err
+    assert console.quit_called
@@ -0,0 +1,77 @@
+import base64
+
+import pytest
+
+import mfa
+
+# the SHA-1 seed from RFC 6238 appendix B
+RFC_KEY = b"12345678901234567890"
+
+
+@pytest.mark.parametrize("for_time, code", [
+    (59, "94287082"),
+    (1111111109, "07081804"),
+    (1111111111, "14050471"),
+    (1234567890, "89005924"),
+    (2000000000, "69279037"),
+    (20000000000, "65353130"),
+])
+def test_rfc_6238_vectors(for_time, code):
+    assert mfa.totp(RFC_KEY, for_time, digits=8) == code
+
+
+def test_six_digit_codes_are_the_last_six_digits():
+    assert mfa.totp(RFC_KEY, 59) == "287082"
+
+
+def test_seed_is_read_like_aws_shows_it():
+    seed = base64.b32encode(RFC_KEY).decode().lower()
+    spaced = " ".join(seed[i:i + 4] for i in range(0, len(seed), 4))
+    assert mfa.decode_seed(spaced) == RFC_KEY
+    with pytest.raises(mfa.MfaUnavailableError):
+        mfa.decode_seed("not base32!")
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(0)
+    monkeypatch.setattr(mfa, "time", clock)
+    return clock
+
+
+def provider():
+    return mfa.TotpProvider(base64.b32encode(RFC_KEY).decode())
+
+
+def test_code_for_the_current_step(clock):
+    clock.now = 1000 * mfa.TOTP_STEP + 10
+    assert provider().next_code() == mfa.totp(RFC_KEY, 1000 * mfa.TOTP_STEP)
+    assert clock.slept == 0
+
+
+def test_code_is_never_reused(clock):
+    clock.now = 1000 * mfa.TOTP_STEP + 10
+    totp = provider()
+    first = totp.next_code()
+    second = totp.next_code()
+    assert second == mfa.totp(RFC_KEY, 1001 * mfa.TOTP_STEP) != first
+    assert clock.slept == pytest.approx(mfa.TOTP_STEP - 10)
+
+
+def test_code_about_to_expire_is_skipped(clock):
+    clock.now = 1001 * mfa.TOTP_STEP - (mfa.MIN_SECONDS_LEFT - 1.5)
+    assert provider().next_code() == mfa.totp(RFC_KEY, 1001 * mfa.TOTP_STEP)
+    assert clock.slept == pytest.approx(mfa.MIN_SECONDS_LEFT - 1.5)
@@ -0,0 +1,34 @@
+import argparse
+
+import config
+import federation
+import preflight
+
+
+def test_federation_credentials_are_looked_up_once(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(federation, "find_credentials", lambda: lookups.append(1) or {"AccessKeyId": "ASIA"})
+    monkeypatch.setattr(preflight, "check_browser", lambda: [])
+    monkeypatch.setattr(config, "LOGIN_METHOD", "federation")
+    args = argparse.Namespace(model_name="amazon.titan-text-express-v1")
+
+    assert preflight.run_preflight(args, None) == []
+    assert len(lookups) == 1
+
+
+def test_preflight_only_leaves_the_journal_and_account_alone(monkeypatch, tmp_path):
+    import bedrock_cli
+    import credentials
+
+    def no_account(fields, *args, **kwargs):
+        raise AssertionError("looked up " + ", ".join(fields))
+
+    monkeypatch.setattr(credentials, "resolve", no_account)
+    monkeypatch.setattr(bedrock_cli, "namespace_account_id", lambda: no_account(["account_id"]))
+    monkeypatch.setattr(bedrock_cli, "read_fresh_cache", lambda args: None)
+    monkeypatch.setattr(preflight, "run_preflight", lambda args, model_index: [])
+    args = argparse.Namespace(model_name=["amazon.titan-text-express-v1"], preflight_only=True, resume=False,
+                              journal=str(tmp_path / "journal.json"))
+
+    bedrock_cli.enable_foundation_model(args)
+    assert not (tmp_path / "journal.json").exists()